@@ -76,6 +76,12 @@ ext_modules = cythonize(
 			extra_compile_args = ['-fopenmp'],
 			extra_link_args = ['-fopenmp'],
 			),
+		Extension(
+			'gravitation.kernel.cy5.core',
+			[os.path.join(SRC_DIR, 'gravitation', 'kernel', 'cy5', 'core.pyx')],
+			extra_compile_args = ['-fopenmp'],
+			extra_link_args = ['-fopenmp'],
+			),
 		],
 	annotate = True,
 	) + [
@@ -117,6 +123,44 @@ ext_modules = cythonize(
 				],
 			extra_link_args = ['-lm', '-fopenmp'],
 			),
+		Extension(
+			'gravitation.kernel._lib5_.lib',
+			[os.path.join(SRC_DIR, 'gravitation', 'kernel', '_lib5_', 'lib.c')],
+			extra_compile_args = [
+				'-std=gnu11',
+				'-fPIC',
+				'-O3',
+				'-ffast-math',
+				'-march=native',
+				'-mtune=native',
+				'-mfpmath=sse',
+				'-fopenmp',
+				'-Wall',
+				'-Wdouble-promotion',
+				'-Winline',
+				'-Werror',
+				],
+			extra_link_args = ['-lm', '-fopenmp'],
+			),
+		Extension(
+			'gravitation.kernel._lib6_.lib',
+			[os.path.join(SRC_DIR, 'gravitation', 'kernel', '_lib6_', 'lib.c')],
+			extra_compile_args = [
+				'-std=gnu11',
+				'-fPIC',
+				'-O3',
+				'-ffast-math',
+				'-march=native',
+				'-mtune=native',
+				'-mfpmath=sse',
+				'-fopenmp',
+				'-Wall',
+				'-Wdouble-promotion',
+				'-Winline',
+				'-Werror',
+				],
+			extra_link_args = ['-lm', '-fopenmp'],
+			),
 	]
 
 # HACK https://github.com/cython/cython/issues/1740#issuecomment-317556084
@@ -178,9 +222,12 @@ setup(
 		'click',
 		# 'cupy',
 		'Cython',
+		'dask',
+		'distributed',
 		'gputil',
 		'h5py',
 		'joblib',
+		'mpi4py',
 		'numba',
 		'numpy',
 		'numexpr',
@@ -191,10 +238,11 @@ setup(
 		'pygame',
 		'py-cpuinfo',
 		'py_mini_racer',
+		'threadpoolctl',
 		# 'torch',
 		],
 	extras_require = {'dev': [
-		# 'pytest',
+		'pytest',
 		'python-language-server',
 		'setuptools',
 		# 'Sphinx',
@@ -28,11 +28,18 @@ specific language governing rights and limitations under the License.
 # IMPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import collections
 import copy
 import json
 
 import click
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+PLATFORM_PREFIX = '{"log": "PLATFORM"' # platform information, logged once per benchmark run
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # ROUTINES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -60,6 +67,15 @@ def _parse_itemstr_to_itemdict(item_str):
 		print(errors)
 		raise SyntaxError('benchmark log has non-JSON components, likely errors')
 
+	if line_list[-1] == {'log': 'EXIT', 'msg': 'SKIPPED'}: # not run by benchmark, predicted too slow
+		skip = copy.deepcopy([line_dict for line_dict in line_list if line_dict['log'] == 'SKIP'])
+		if len(skip) != 1:
+			raise SyntaxError('skipped benchmark worker run needs exactly one SKIP log')
+		item_dict['meta'] = dict(simulation = skip[0]['simulation'], python = skip[0]['python'])
+		item_dict['skipped'] = dict(predicted = skip[0]['predicted'], max_step_time = skip[0]['max_step_time'])
+		item_dict['runtime'], item_dict['gctime'] = [], []
+		return item_dict
+
 	errors = [line_dict for line_dict in line_list if line_dict['log'] == 'ERROR']
 	if len(errors) != 0:
 		print(errors)
@@ -81,6 +97,19 @@ def _parse_itemstr_to_itemdict(item_str):
 		raise SyntaxError('SIZE log missing in benchmark worker run')
 	item_dict['meta']['simulation']['size'] = size[0]['value']
 
+	gil = [line_dict for line_dict in line_list if line_dict['log'] == 'GIL']
+	if len(gil) > 1:
+		raise SyntaxError('more than one GIL log per benchmark worker run')
+	if len(gil) == 1: # after kernel import, python.gil is at interpreter start
+		item_dict['meta']['python']['gil_kernel'] = gil[0]['enabled']
+
+	threads = copy.deepcopy([line_dict for line_dict in line_list if line_dict['log'] == 'THREADS'])
+	if len(threads) > 1:
+		raise SyntaxError('more than one THREADS log per benchmark worker run')
+	if len(threads) == 1: # not logged by older workers
+		threads[0].pop('log')
+		item_dict['meta']['threads'] = threads[0]
+
 	item_dict['runtime'] = [
 		line_dict['runtime']
 		for line_dict in line_list
@@ -91,6 +120,37 @@ def _parse_itemstr_to_itemdict(item_str):
 		for line_dict in line_list
 		if line_dict['log'] == 'STEP'
 		]
+	stats = [
+		line_dict['stats']
+		for line_dict in line_list
+		if line_dict['log'] == 'STEP' and 'stats' in line_dict.keys()
+		]
+	if len(stats) > 0: # kernel-specific, see universe_base.get_stats
+		item_dict['stats'] = stats
+
+	startup = [line_dict for line_dict in line_list if line_dict['log'] == 'STARTUP']
+	if len(startup) > 1:
+		raise SyntaxError('more than one STARTUP log per benchmark worker run')
+	if len(startup) == 1: # ns per phase until first result
+		item_dict['startup'] = {k: v for k, v in startup[0].items() if k != 'log'}
+
+	item_dict['warmup'] = [
+		line_dict['runtime']
+		for line_dict in line_list
+		if line_dict['log'] == 'WARMUP'
+		]
+	warmup_done = [line_dict for line_dict in line_list if line_dict['log'] == 'WARMUP_DONE']
+	if len(warmup_done) > 1:
+		raise SyntaxError('more than one WARMUP_DONE log per benchmark worker run')
+	if len(warmup_done) == 1: # time of warm-up steps in excess of steady state, e.g. JIT compilation
+		item_dict['compile_time'] = warmup_done[0]['compile_time']
+
+	ci = copy.deepcopy([line_dict for line_dict in line_list if line_dict['log'] == 'CI'])
+	if len(ci) > 1:
+		raise SyntaxError('more than one CI log per benchmark worker run')
+	if len(ci) == 1: # adaptive workers only
+		ci[0].pop('log')
+		item_dict['ci'] = ci[0]
 
 	counter = [
 		line_dict['counter']
@@ -107,14 +167,59 @@ def _parse_itemstr_to_itemdict(item_str):
 
 	return item_dict
 
-def _parse_logstr_to_datalist(log_str):
-	"""parse a benchmark log consisting of multiple worker runs to list of dict"""
+def _get_platforms(log_str):
+	"""returns platform information logged once per benchmark run (PLATFORM), by reference"""
+	platforms = {}
+	for line in log_str.split('\n'):
+		if line.startswith(PLATFORM_PREFIX):
+			line_dict = json.loads(line)
+			line_dict.pop('log')
+			platforms[line_dict['ref']] = line_dict
+	return platforms
+
+def _split_logstr_to_itemstrs(log_str):
+	"""split a benchmark log into logs of individual worker runs,
+	lines of concurrent workers are prefixed with a job tag and a tab"""
+	jobs = collections.OrderedDict()
+	for line in log_str.split('\n'):
+		if line.startswith(PLATFORM_PREFIX): # benchmark run, not worker run
+			continue
+		tag, sep, tagged_line = line.partition('\t')
+		if sep != '' and tag.isdigit():
+			jobs.setdefault(int(tag), []).append(tagged_line)
+		else:
+			jobs.setdefault(None, []).append(line)
 	return [
-		_parse_itemstr_to_itemdict(item)
-		for item in log_str.split('{"log": "START"}\n')
+		item
+		for lines in jobs.values()
+		for item in ('\n'.join(lines) + '\n').split('{"log": "START"}\n')
 		if item.strip() != ''
 		]
 
+def _parse_logstr_to_datalist(log_str, skip_failed = False):
+	"""parse a benchmark log consisting of multiple worker runs to list of dict,
+	optionally skipping failed or incomplete runs (e.g. interrupted by a resumed benchmark)"""
+	platforms = _get_platforms(log_str)
+	datalist = []
+	for item in _split_logstr_to_itemstrs(log_str):
+		try:
+			datalist.append(_resolve_platform(_parse_itemstr_to_itemdict(item), platforms))
+		except SyntaxError as e:
+			if not skip_failed:
+				raise
+			print('Skipping worker run: %s' % str(e))
+	return datalist
+
+def _resolve_platform(item_dict, platforms):
+	"""replaces reference to platform information by information"""
+	platform = item_dict['meta'].get('platform', {})
+	if set(platform.keys()) != {'ref'}: # collected by worker or skipped
+		return item_dict
+	if platform['ref'] not in platforms:
+		raise SyntaxError('unknown platform reference "%s"' % platform['ref'])
+	item_dict['meta']['platform'] = platforms[platform['ref']]
+	return item_dict
+
 @click.command(short_help = 'analyze benchmark logfile')
 @click.option(
 	'--logfile', '-l',
@@ -126,9 +231,14 @@ def _parse_logstr_to_datalist(log_str):
 	default = 'benchmark.json', type = click.File('w'), show_default = True,
 	help = 'name of output data file',
 	)
-def analyze(logfile, data):
+@click.option(
+	'--skip_failed',
+	is_flag = True, default = False, show_default = True,
+	help = 'skip failed or incomplete worker runs instead of aborting',
+	)
+def analyze(logfile, data, skip_failed):
 	"""analyze benchmark logfile"""
 	data.write(json.dumps(
-		_parse_logstr_to_datalist(logfile.read()),
+		_parse_logstr_to_datalist(logfile.read(), skip_failed = skip_failed),
 		indent = '\t', sort_keys = True,
 		))
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/cli/autotune.py: autotune command
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import click
+import psutil
+
+from ..lib.autotune import PROBE_STEPS, autotune as autotune_kernel, get_cache_fn
+from ..lib.load import inventory
+from .benchmark import _range
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+MAX_TREADS = psutil.cpu_count(logical = True)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@click.command(short_help = 'tune thread counts per kernel and size')
+@click.option(
+	'--kernel', '-k',
+	type = click.Choice(sorted(list(inventory.keys()))), multiple = True,
+	help = 'name of kernel module, can be specified multiple times',
+	)
+@click.option(
+	'--all_kernels', '-a',
+	is_flag = True, default = False, show_default = True,
+	help = 'tune all kernels',
+	)
+@click.option(
+	'--n_body_power_boundaries', '-b',
+	default = (2, 16), type = (int, int), show_default = True,
+	help = '2^x bodies in simulation, for x from lower to upper boundary',
+	)
+@click.option(
+	'--threads', '-p',
+	type = click.Choice([str(i) for i in range(1, MAX_TREADS + 1)]),
+	multiple = True,
+	help = ('number of threads/processes to probe, can be specified multiple times, '
+		'defaults to powers of two up to the number of available threads'),
+	)
+@click.option(
+	'--steps',
+	default = PROBE_STEPS, type = int, show_default = True,
+	help = 'timed simulation steps per probe',
+	)
+def autotune(kernel, all_kernels, n_body_power_boundaries, threads, steps):
+	"""tune thread counts per kernel and size"""
+
+	kernels = sorted(list(inventory.keys())) if all_kernels else list(kernel)
+	candidates = None if len(threads) == 0 else sorted({int(n) for n in threads})
+
+	failed = []
+	for kernel_name in kernels:
+		inventory[kernel_name].load_meta()
+		if inventory[kernel_name]['mpi'] is True:
+			print('{kernel:s}: MPI kernel, probing one rank only (see benchmark --ranks)'.format(kernel = kernel_name))
+		for bodies in _range(*n_body_power_boundaries):
+			try:
+				result = autotune_kernel(
+					kernel_name, 'galaxy', {'stars_len': bodies}, candidates = candidates, steps = steps,
+					)
+			except Exception as e: # e.g. missing dependencies, continue with next kernel
+				print('{kernel:s} {bodies:d}: failed ({name:s}: {msg:s}), skipping kernel'.format(
+					kernel = kernel_name, bodies = bodies, name = type(e).__name__, msg = str(e),
+					))
+				failed.append(kernel_name)
+				break
+			print('{kernel:s} {bodies:d}: {threads:d} threads ({runtimes:s})'.format(
+				kernel = kernel_name,
+				bodies = bodies,
+				threads = result['threads'],
+				runtimes = ', '.join(
+					'{threads:s}: {runtime:.3e} s'.format(threads = threads_num, runtime = runtime / 1e9)
+					for threads_num, runtime in sorted(result['runtimes'].items(), key = lambda x: int(x[0]))
+					),
+				))
+
+	if len(failed) > 0:
+		print('Failed kernels: %s' % ', '.join(failed))
+	print('Results cached in %s' % get_cache_fn())
@@ -29,16 +29,26 @@ specific language governing rights and limitations under the License.
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 import atexit
+import collections
+import concurrent.futures
+import contextlib
+import io
 import json
 import math
+import os
 import shutil
+import threading
 
 import asciiplotlib as apl
 import click
 import psutil
 
 from ..lib import proc
+from ..lib.affinity import allocate_cpus, format_cpus, get_available_cpus, get_numa_topology, parse_cpus
+from ..lib.build import CFLAGS_DEFAULT
 from ..lib.load import inventory
+from ..lib.sysinfo import get_sysinfo
+from .analyze import _parse_itemstr_to_itemdict, _split_logstr_to_itemstrs
 from .worker import worker_command
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -47,22 +57,40 @@ from .worker import worker_command
 
 MAX_TREADS = psutil.cpu_count(logical = True)
 
+TAG_SEP = '\t' # separates job tag and line in logs of concurrent workers
+
+FIT_POINTS = 4 # largest completed sizes used for predicting runtimes of larger sizes
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # ROUTINES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-def _process_data(kernel, threads, bodies, results_dict, outputlines_list, fh, display):
-	"""factory, returning function for reading a worker log in realtime"""
+def _get_label(kernel, threads, cc = None, cflags = None):
+	"""returns trace label, kernel@threads plus compiler and flags if built on demand"""
+	label = '{kernel}@{threads}'.format(kernel = kernel, threads = threads)
+	if cc is not None:
+		label += ' [{cc} {cflags}]'.format(cc = cc, cflags = cflags)
+	return label
+
+def _process_data(label, bodies, results_dict, outputlines_list, fh, display, lock, tag = None):
+	"""factory, returning function for reading a worker log in realtime,
+	lines are prefixed with tag of their job if jobs run concurrently"""
 	def callback(stream_id, msg_line):
-		fh.write(msg_line + '\n')
+		with lock:
+			_callback(stream_id, msg_line)
+	def _callback(stream_id, msg_line):
+		tagged_line = msg_line if tag is None else '{tag:d}{sep:s}{line:s}'.format(
+			tag = tag, sep = TAG_SEP, line = msg_line,
+			)
+		fh.write(tagged_line + '\n')
 		if display == 'log':
-			print(msg_line)
+			print(tagged_line)
 		outputlines_list.append(msg_line)
 		try:
 			msg = json.loads(msg_line)
 		except:
 			return
-		results_kernel_dict = results_dict[kernel][threads]
+		results_kernel_dict = results_dict[label]
 		if msg['log'] == 'BEST_TIME':
 			if bodies not in results_kernel_dict.keys():
 				results_kernel_dict[bodies] = msg['value']
@@ -80,7 +108,7 @@ def _process_data(kernel, threads, bodies, results_dict, outputlines_list, fh, d
 		fig = apl.figure()
 		fig.plot(
 			x, y,
-			label = '{kernel}@{threads}'.format(kernel = kernel, threads = threads),
+			label = label,
 			width = t.columns, height = t.lines,
 			extra_gnuplot_arguments = [
 				'set logscale x 2',
@@ -91,6 +119,144 @@ def _process_data(kernel, threads, bodies, results_dict, outputlines_list, fh, d
 		fig.show()
 	return callback
 
+def _get_interpreter_path(interpreter):
+	"""returns resolved path of interpreter command, for comparison with sys.executable of workers"""
+	return os.path.realpath(shutil.which(interpreter) or interpreter)
+
+def _get_run_key(kernel, threads, bodies, interpreter_path, cc = None, cflags = None):
+	"""identifies one worker run, i.e. one point of one trace"""
+	return (kernel, '%s' % threads, bodies, interpreter_path, cc, cflags)
+
+def _get_completed(logfile):
+	"""returns best runtimes of worker runs in existing log which exited OK (by run key)
+	and the next free job tag"""
+	try:
+		with open(logfile, 'r') as f:
+			log_str = f.read()
+	except FileNotFoundError:
+		return {}, 0
+	completed = {}
+	for item in _split_logstr_to_itemstrs(log_str):
+		try:
+			with contextlib.redirect_stdout(io.StringIO()): # parser prints errors of failed runs
+				item_dict = _parse_itemstr_to_itemdict(item)
+			simulation = item_dict['meta']['simulation']
+			key = _get_run_key(
+				simulation['kernel'],
+				'auto' if simulation.get('threads_auto', False) else simulation['threads'],
+				simulation['size'],
+				os.path.realpath(item_dict['meta']['python']['executable']),
+				simulation.get('cc', None), simulation.get('cflags', None),
+				)
+		except (SyntaxError, KeyError, TypeError): # incomplete, failed or from older workers
+			continue
+		if 'skipped' in item_dict.keys(): # predicted again, e.g. for a different budget
+			continue
+		completed[key] = min(item_dict['runtime'])
+	tags = [
+		int(line.partition(TAG_SEP)[0]) for line in log_str.split('\n')
+		if TAG_SEP in line and line.partition(TAG_SEP)[0].isdigit()
+		]
+	return completed, max(tags) + 1 if len(tags) > 0 else 0
+
+def _get_cpus_len(series, available_len):
+	"""returns number of CPUs a series of worker runs occupies, all for MPI and tuned thread counts"""
+	if series['mpi'] or series['threads_num'] == 'auto':
+		return available_len
+	return min(series['threads_num'], available_len)
+
+def _run_series(
+	kernel_name, threads_num, cc_name, cflags_str, mpi, series_cpus, tag,
+	n_body_power_boundaries, data_out_file, interpreter, save_after_iteration,
+	min_iterations, min_total_runtime, ci_target, max_total_runtime, warmup, pin, mpirun, isolation,
+	platform_ref, results_dict, outputlines_list, fh, lock, display, completed, max_step_time,
+	):
+	"""runs workers for all sizes of one kernel, build and thread count one after another,
+	skips sizes which have been completed before or which are predicted to exceed max_step_time"""
+	serve = isolation == 'kernel' and not mpi # MPI jobs are launched one by one
+	server = None
+	label = _get_label(kernel_name, threads_num, cc_name, cflags_str)
+	interpreter_path = _get_interpreter_path(interpreter)
+	for bodies in _range(*n_body_power_boundaries):
+		key = _get_run_key(kernel_name, threads_num, bodies, interpreter_path, cc_name, cflags_str)
+		if key in completed:
+			with lock:
+				results_dict[label][bodies] = completed[key]
+			continue
+		processing = _process_data(
+			label, bodies,
+			results_dict, outputlines_list, fh, display, lock, tag,
+			)
+		if max_step_time is not None:
+			with lock:
+				results = dict(results_dict[label])
+			predicted = _predict_runtime(results, bodies)
+			if predicted is not None and predicted * min_iterations > max_step_time * 10**9:
+				for msg in (
+					dict(log = 'START'),
+					dict(
+						log = 'SKIP',
+						simulation = dict(
+							kernel = kernel_name, scenario = 'galaxy', size = bodies,
+							threads = threads_num, threads_auto = threads_num == 'auto',
+							cc = cc_name, cflags = cflags_str,
+							),
+						python = dict(executable = interpreter_path),
+						predicted = predicted,
+						max_step_time = max_step_time,
+						),
+					dict(log = 'EXIT', msg = 'SKIPPED'),
+					):
+					processing(proc.STDOUT, json.dumps(msg))
+				continue
+		command = worker_command(
+			data_out_file, interpreter, kernel_name, 'galaxy', {'stars_len': bodies},
+			save_after_iteration, min_iterations, min_total_runtime, threads_num,
+			cc = cc_name, cflags = cflags_str, cpus = series_cpus, pin = pin,
+			mpirun = mpirun if mpi else None, serve = serve,
+			ci_target = ci_target, max_total_runtime = max_total_runtime, warmup = warmup,
+			platform_ref = platform_ref,
+			)
+		if not serve:
+			proc.run_command(command, unbuffer = True, processing = processing)
+		else:
+			if server is None: # (re-)start, e.g. after a crash
+				server = proc.server(command, unbuffer = True)
+			if not server.run(
+				json.dumps({'scenario_param': {'stars_len': bodies}}), processing, _is_exit,
+				):
+				server.close(processing)
+				server = None
+		with lock:
+			fh.flush()
+	if server is not None:
+		server.close(processing)
+		with lock:
+			fh.flush()
+
+def _predict_runtime(results, bodies):
+	"""
+	predicts step runtime [ns] for bodies from best runtimes of smaller sizes (dict), fitting
+	t = a + b * N^2 to the largest ones, None if there are too few. Overheads make the fit
+	underestimate rather than overestimate, so sizes are skipped late rather than early.
+	"""
+	points = sorted((n, t) for n, t in results.items() if n < bodies)[-FIT_POINTS:]
+	if len(points) < 2:
+		return None
+	x = [float(n) ** 2 for n, _ in points]
+	y = [float(t) for _, t in points]
+	x_mean, y_mean = sum(x) / len(x), sum(y) / len(y)
+	b = sum((xi - x_mean) * (yi - y_mean) for xi, yi in zip(x, y)) / sum((xi - x_mean) ** 2 for xi in x)
+	a = y_mean - b * x_mean
+	return max(a + b * float(bodies) ** 2, max(y)) # runtime does not decrease with size
+
+def _is_exit(msg_line):
+	"""True if a line of a worker log ends a job"""
+	try:
+		return json.loads(msg_line)['log'] == 'EXIT'
+	except:
+		return False
+
 def _range(start, end):
 	"""special range generator, going from 2^start to 2^end with some interpolation"""
 	l = [2 ** i for i in range(start, end + 1)]
@@ -149,6 +315,22 @@ def _range(start, end):
 	default = 10, type = int, show_default = True,
 	help = 'minimal total runtime of (all) steps, in seconds',
 	)
+@click.option(
+	'--ci_target',
+	default = None, type = float,
+	help = ('adaptive workers: after min_iterations, step until the 95% confidence interval of the median '
+		'step runtime is narrower than +/- this fraction of it (e.g. 0.01), ignores min_total_runtime'),
+	)
+@click.option(
+	'--max_total_runtime',
+	default = 600, type = int, show_default = True,
+	help = 'adaptive workers: maximal total runtime of (all) steps, in seconds',
+	)
+@click.option(
+	'--warmup', '-w',
+	default = '0', type = str, show_default = True,
+	help = 'number of untimed warm-up steps (e.g. JIT compilation), "auto" to step until runtimes settle',
+	)
 @click.option(
 	'--display', '-d',
 	default = 'plot', type = click.Choice(['plot', 'log', 'none']), show_default = True,
@@ -156,50 +338,158 @@ def _range(start, end):
 	)
 @click.option(
 	'--threads', '-p',
-	type = click.Choice([str(i) for i in range(1, MAX_TREADS + 1)]),
+	type = click.Choice([str(i) for i in range(1, MAX_TREADS + 1)] + ['auto']),
 	multiple = True,
 	help = ('number of threads/processes for parallel implementations, '
+		'"auto" for tuned (cached) count per kernel and size, '
 		'can be specified multiple times, defaults to maximum number of available threads'),
 	)
+@click.option(
+	'--cc',
+	default = '', type = str, show_default = True,
+	help = ('comma-separated list of C compilers for kernels with C libraries, '
+		'built on demand and cached, defaults to pre-built libraries'),
+	)
+@click.option(
+	'--cflags',
+	type = str, multiple = True,
+	help = 'C compiler flags for --cc, can be specified multiple times, defaults to setup.py optimizations',
+	)
+@click.option(
+	'--cpus',
+	default = '', type = str, show_default = True,
+	help = 'CPUs for workers to run on, e.g. "0-3,8", defaults to all available CPUs',
+	)
+@click.option(
+	'--pin',
+	is_flag = True, default = False, show_default = True,
+	help = 'pin OpenMP threads and pool processes of workers to one CPU each',
+	)
+@click.option(
+	'--mpirun',
+	default = 'mpirun -n {threads}', type = str, show_default = True,
+	help = 'launcher command for workers of MPI kernels, "{threads}" is replaced by number of ranks',
+	)
+@click.option(
+	'--ranks',
+	type = click.IntRange(min = 1), multiple = True,
+	help = ('number of ranks for MPI kernels, may exceed local threads, '
+		'can be specified multiple times, defaults to numeric --threads'),
+	)
+@click.option(
+	'--isolation',
+	default = 'process', type = click.Choice(['process', 'kernel']), show_default = True,
+	help = ('"process": new worker per kernel, threads and size; '
+		'"kernel": one worker per kernel, build and threads serves all sizes'),
+	)
+@click.option(
+	'--jobs', '-j',
+	default = 1, type = click.IntRange(min = 1), show_default = True,
+	help = ('maximum number of concurrent workers, each on its own set of CPUs (one per thread), '
+		'MPI kernels and "auto" threads occupy all CPUs'),
+	)
+@click.option(
+	'--resume',
+	is_flag = True, default = False, show_default = True,
+	help = 'append to existing log file, skip runs which completed successfully before',
+	)
+@click.option(
+	'--max_step_time',
+	default = None, type = float,
+	help = ('skip sizes for which min_iterations steps are predicted to take longer than this many seconds, '
+		'based on an O(N^2) fit of smaller sizes, disabled by default'),
+	)
 def benchmark(
 	logfile, data_out_file, interpreter, kernel, all_kernels, n_body_power_boundaries,
-	save_after_iteration, min_iterations, min_total_runtime, display, threads,
+	save_after_iteration, min_iterations, min_total_runtime, ci_target, max_total_runtime, warmup,
+	display, threads, cc, cflags,
+	cpus, pin, mpirun, ranks, isolation, jobs, resume, max_step_time,
 	):
 	"""run a benchmark across kernels"""
 
+	if jobs > 1 and any(iteration >= 0 for iteration in save_after_iteration):
+		raise click.UsageError('concurrent workers (--jobs) can not save data into one file')
+
 	if all_kernels:
 		kernels = sorted(list(inventory.keys()))
 	else:
 		kernels = list(kernel)
 
-	threads = [MAX_TREADS] if len(threads) == 0 else sorted([int(n) for n in threads])
+	cpus_len = len(parse_cpus(cpus)) if cpus else MAX_TREADS
+	threads = [cpus_len] if len(threads) == 0 else (
+		sorted({int(n) for n in threads if n != 'auto'}) + (['auto'] if 'auto' in threads else [])
+		)
+	ranks = sorted(set(ranks)) if len(ranks) > 0 else ([n for n in threads if n != 'auto'] or [cpus_len])
+
+	builds = [
+		(cc_name.strip(), cflags_str)
+		for cc_name in cc.split(',') if cc_name.strip() != ''
+		for cflags_str in (cflags if len(cflags) > 0 else [CFLAGS_DEFAULT])
+		]
 
-	results_dict = {kernel_name: {
-		threads_num: dict() for threads_num in range(1, MAX_TREADS + 1)
-		} for kernel_name in kernels}
+	results_dict = collections.defaultdict(dict)
 	outputlines_list = []
 
-	fh = open(logfile, 'w')
+	completed, tag_offset = _get_completed(logfile) if resume else ({}, 0)
+	fh = open(logfile, 'a' if resume else 'w')
+	if resume and fh.tell() > 0:
+		fh.write('\n') # in case last line was cut off
+	sysinfo = get_sysinfo() # once per run, workers only reference it
+	fh.write(json.dumps(dict(log = 'PLATFORM', **sysinfo)) + '\n')
+	fh.flush()
 	def shutdown():
 		fh.close()
 	atexit.register(shutdown)
 
+	series_list = []
 	for kernel_name in kernels:
 		inventory[kernel_name].load_meta()
 		parallel = inventory[kernel_name]['parallel']
 		parallel = parallel if isinstance(parallel, bool) else False
-		threads_iterator = threads if parallel else [1]
-		for threads_num in threads_iterator:
-			for bodies in _range(*n_body_power_boundaries):
-				proc.run_command(
-					worker_command(
-						data_out_file, interpreter, kernel_name, 'galaxy', {'stars_len': bodies},
-						save_after_iteration, min_iterations, min_total_runtime, threads_num,
-						),
-					unbuffer = True,
-					processing = _process_data(
-						kernel_name, threads_num, bodies,
-						results_dict, outputlines_list, fh, display,
-						),
-					)
-				fh.flush()
+		mpi = inventory[kernel_name]['mpi'] is True
+		threads_iterator = ranks if mpi else (threads if parallel else [1])
+		builds_iterator = builds if inventory[kernel_name]['libraries'] and len(builds) > 0 else [(None, None)]
+		for cc_name, cflags_str in builds_iterator:
+			for threads_num in threads_iterator:
+				series_list.append(dict(
+					kernel_name = kernel_name, threads_num = threads_num,
+					cc_name = cc_name, cflags_str = cflags_str, mpi = mpi,
+					))
+
+	def run_series(series, series_cpus, tag):
+		_run_series(
+			**series, series_cpus = series_cpus, tag = tag,
+			n_body_power_boundaries = n_body_power_boundaries, data_out_file = data_out_file,
+			interpreter = interpreter, save_after_iteration = save_after_iteration,
+			min_iterations = min_iterations, min_total_runtime = min_total_runtime,
+			ci_target = ci_target, max_total_runtime = max_total_runtime, warmup = warmup,
+			pin = pin, mpirun = mpirun, isolation = isolation, platform_ref = sysinfo['ref'],
+			results_dict = results_dict, outputlines_list = outputlines_list, fh = fh, lock = lock,
+			display = display, completed = completed, max_step_time = max_step_time,
+			)
+
+	lock = threading.Lock()
+	if jobs == 1:
+		for series in series_list:
+			run_series(series, cpus, None)
+		return
+
+	# Pack series onto disjoint CPU sets, first come first served, smaller series may overtake
+	available = parse_cpus(cpus) if cpus else get_available_cpus()
+	nodes = get_numa_topology()
+	free, pending, running = set(available), list(enumerate(series_list, start = tag_offset)), {}
+	with concurrent.futures.ThreadPoolExecutor(max_workers = jobs) as executor:
+		while len(pending) > 0 or len(running) > 0:
+			for tag, series in list(pending):
+				if len(running) >= jobs:
+					break
+				series_cpus = allocate_cpus(free, _get_cpus_len(series, len(available)), nodes)
+				if series_cpus is None:
+					continue
+				pending.remove((tag, series))
+				free -= set(series_cpus)
+				running[executor.submit(run_series, series, format_cpus(series_cpus), tag)] = series_cpus
+			done, _ = concurrent.futures.wait(running, return_when = concurrent.futures.FIRST_COMPLETED)
+			for future in done:
+				free |= set(running.pop(future))
+				future.result()
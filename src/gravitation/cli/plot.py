@@ -35,10 +35,42 @@ import plotly.graph_objs as go
 
 import click
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+STARTUP_PHASES = ('load_module', 'create_simulation', 'start_kernel', 'first_step') # see worker
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # ROUTINES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+def _get_label(item):
+	"""returns trace label, kernel@threads [cc cflags], same as in live benchmark plot"""
+	label = '{kernel}@{threads}'.format(
+		kernel = item['meta']['simulation']['kernel'],
+		threads = 'auto' if item['meta']['simulation'].get('threads_auto', False) # logs without autotune
+			else item['meta']['simulation']['threads'],
+		)
+	if item['meta']['simulation'].get('cc', None) is not None: # logs without build info
+		label += ' [{cc} {cflags}]'.format(
+			cc = item['meta']['simulation']['cc'],
+			cflags = item['meta']['simulation']['cflags'],
+			)
+	return label
+
+def _get_value(item, metric):
+	"""returns time in ns of item for metric, None if not logged"""
+	if metric == 'step':
+		return min(item['runtime'])
+	if 'startup' not in item.keys(): # logs without start-up times
+		return None
+	if item['meta']['simulation'].get('serve', False): # module imported and JIT code compiled by earlier job
+		return None
+	if metric == 'startup':
+		return sum(item['startup'][phase] for phase in STARTUP_PHASES)
+	return item['startup'][metric]
+
 @click.command(short_help = 'plot benchmark json data file')
 @click.option(
 	'--logfile', '-l',
@@ -53,7 +85,12 @@ import click
 		), show_default = True, required = True,
 	help = 'name of output html file',
 	)
-def plot(logfile, html_out):
+@click.option(
+	'--metric', '-m',
+	default = 'step', type = click.Choice(['step', 'startup', *STARTUP_PHASES]), show_default = True,
+	help = 'what to plot: best time per step, total start-up time until first result or one phase of it (process isolation only)',
+	)
+def plot(logfile, html_out, metric):
 	"""plot benchmark json data file"""
 
 	data_list = []
@@ -61,15 +98,20 @@ def plot(logfile, html_out):
 		data_list.extend(json.loads(f.read()))
 
 	data_dict = {item: dict() for item in {
-		item['meta']['simulation']['kernel'] for item in data_list
+		_get_label(item) for item in data_list
 		}}
 
 	for item in data_list:
+		if 'skipped' in item.keys(): # predicted too slow, not run
+			continue
+		value = _get_value(item, metric)
+		if value is None:
+			continue
 		data_dict[
-			item['meta']['simulation']['kernel']
+			_get_label(item)
 			][
 			item['meta']['simulation']['size']
-			] = min(item['runtime'])
+			] = value
 
 	traces = []
 	for kernel_name, kernel_results in sorted(data_dict.items(), key = lambda x: x[0]):
@@ -93,7 +135,7 @@ def plot(logfile, html_out):
 			autorange = True,
 			scaleanchor = 'x',
 			scaleratio = 0.3,
-			title = 'time per iteration [s]',
+			title = 'time per iteration [s]' if metric == 'step' else 'start-up time (%s) [s]' % metric,
 			)
 	)
 	fig = go.Figure(data = traces, layout = layout)
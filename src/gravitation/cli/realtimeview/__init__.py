@@ -36,6 +36,7 @@ import click
 import psutil
 
 from ...lib.load import inventory
+from ...lib.threads import configure as configure_threads
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CONST
@@ -97,6 +98,7 @@ def realtimeview(kernel, scenario, scenario_param, steps_per_frame, max_iteratio
 
 	scenario_param = json.loads(scenario_param)
 	threads = int(threads)
+	configure_threads(threads) # before kernel is loaded by viewer
 
 	view_param_pos = (
 		kernel, threads, scenario, scenario_param,
@@ -32,26 +32,22 @@ import gc
 import itertools
 import json
 import platform
+import shlex
 import sys
 import traceback
 
 import click
 import psutil
 
-try:
-	import cpuinfo
-	CPUINFO = True
-except:
-	CPUINFO = False
-
-try:
-	import GPUtil
-	GPUINFO = True
-except:
-	GPUINFO = False
-
+from ..lib.affinity import (
+	configure as configure_affinity, get_config as get_affinity_config, parse_cpus,
+	)
+from ..lib.autotune import get_tuned_threads
+from ..lib.build import configure as configure_build, get_config as get_build_config
 from ..lib.load import inventory
 from ..lib.simulation import create_simulation, store_simulation
+from ..lib.sysinfo import get_sysinfo
+from ..lib.threads import configure as configure_threads, get_runtime_threads, verify as verify_threads
 from ..lib.timing import best_run_timer, elapsed_timer
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -60,10 +56,32 @@ from ..lib.timing import best_run_timer, elapsed_timer
 
 MAX_TREADS = psutil.cpu_count(logical = True)
 
+WARMUP_MAX = 20 # maximum number of warm-up steps if detected automatically
+WARMUP_TOLERANCE = 0.1 # relative difference of consecutive steps after warm-up
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class _job_exit(Exception):
+	"""ends a job early, with status for its EXIT log"""
+	def __init__(self, status):
+		super().__init__(status)
+		self.status = status
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # ROUTINES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+def _is_gil_enabled():
+	"""True if the GIL is enabled, which it always is prior to free-threaded CPython 3.13t"""
+	return getattr(sys, '_is_gil_enabled', lambda: True)()
+
+def _get_mpi_comm():
+	"""returns (rank, size) of this process within its MPI job"""
+	from mpi4py import MPI # optional dependency, only required for MPI kernels
+	return MPI.COMM_WORLD.Get_rank(), MPI.COMM_WORLD.Get_size()
+
 @click.command(short_help = 'isolated single-kernel benchmark worker')
 @click.option(
 	'--kernel', '-k',
@@ -100,39 +118,171 @@ MAX_TREADS = psutil.cpu_count(logical = True)
 	default = 10, type = int, show_default = True,
 	help = 'minimal total runtime of (all) steps, in seconds',
 	)
+@click.option(
+	'--ci_target',
+	default = None, type = float,
+	help = ('adaptive mode: after min_iterations, step until the 95% confidence interval of the median '
+		'step runtime is narrower than +/- this fraction of it (e.g. 0.01), ignores min_total_runtime'),
+	)
+@click.option(
+	'--max_total_runtime',
+	default = 600, type = int, show_default = True,
+	help = 'adaptive mode: maximal total runtime of (all) steps, in seconds',
+	)
+@click.option(
+	'--warmup', '-w',
+	default = '0', type = str, show_default = True,
+	help = 'number of untimed warm-up steps (e.g. JIT compilation), "auto" to step until runtimes settle',
+	)
 @click.option(
 	'--threads', '-p',
-	default = '1', type = click.Choice([str(i) for i in range(1, MAX_TREADS + 1)]),
+	default = '1', type = click.Choice([str(i) for i in range(1, MAX_TREADS + 1)] + ['auto']),
 	show_default = True,
-	help = 'number of threads/processes for parallel implementations',
+	help = 'number of threads/processes for parallel implementations, "auto" for tuned (cached) count',
+	)
+@click.option(
+	'--cc',
+	default = '', type = str, show_default = True,
+	help = 'C compiler for kernel libraries, built on demand and cached, pre-built if not specified',
+	)
+@click.option(
+	'--cflags',
+	default = '', type = str, show_default = True,
+	help = 'C compiler flags for kernel libraries, requires --cc, defaults to setup.py optimizations',
+	)
+@click.option(
+	'--cpus',
+	default = '', type = str, show_default = True,
+	help = 'CPUs to run on, e.g. "0-3,8", defaults to all available CPUs',
+	)
+@click.option(
+	'--pin',
+	is_flag = True, default = False, show_default = True,
+	help = 'pin OpenMP threads and pool processes to one CPU each',
+	)
+@click.option(
+	'--mpi',
+	is_flag = True, default = False, show_default = True,
+	help = 'run as one rank of an MPI job (see mpirun), number of ranks overrides threads, rank 0 reports',
+	)
+@click.option(
+	'--serve',
+	is_flag = True, default = False, show_default = True,
+	help = 'run jobs read from stdin, one JSON object of options per line, in one interpreter',
+	)
+@click.option(
+	'--platform_ref',
+	default = None, type = str, show_default = True,
+	help = 'reference to platform information logged once per benchmark (PLATFORM), collected if not specified',
 	)
 def worker(
 	kernel, scenario, scenario_param,
-	data_out_file, save_after_iteration, min_iterations, min_total_runtime, threads,
+	data_out_file, save_after_iteration, min_iterations, min_total_runtime,
+	ci_target, max_total_runtime, warmup, threads,
+	cc, cflags, cpus, pin, mpi, serve, platform_ref,
 	):
 	"""isolated single-kernel benchmark worker"""
 
+	if mpi and serve:
+		raise click.UsageError('--mpi and --serve are mutually exclusive')
+
+	rank, ranks = _get_mpi_comm() if mpi else (0, 1)
+
 	def _msg(**d):
+		if rank != 0: # other ranks of MPI job are silent
+			return
 		sys.stdout.write(json.dumps(d) + '\n')
 		sys.stdout.flush()
 
-	def _step():
+	options = dict(
+		kernel = kernel, scenario = scenario, scenario_param = scenario_param,
+		data_out_file = data_out_file, save_after_iteration = save_after_iteration,
+		min_iterations = min_iterations, min_total_runtime = min_total_runtime,
+		ci_target = ci_target, max_total_runtime = max_total_runtime, warmup = warmup, threads = threads,
+		cc = cc, cflags = cflags, cpus = cpus, pin = pin, platform_ref = platform_ref,
+		)
+
+	if not serve:
+		_run_job(_msg, rank, ranks, mpi = mpi, serve = serve, **options)
+		sys.exit()
+
+	# One job per line, JSON object of options which differ from the command line
+	for line in iter(sys.stdin.readline, ''):
+		if line.strip() == '':
+			continue
+		try:
+			job = json.loads(line)
+			if not isinstance(job, dict) or not set(job.keys()) <= set(options.keys()):
+				raise ValueError('job must be a JSON object of worker options: %s' % line.strip())
+		except:
+			_msg(log = 'START')
+			_msg(log = 'ERROR', msg = traceback.format_exc())
+			_msg(log = 'EXIT', msg = 'BAD')
+			continue
+		_run_job(_msg, rank, ranks, mpi = mpi, serve = serve, **dict(options, **job))
+	sys.exit()
+
+def _run_job(_msg, rank, ranks, **job):
+	"""runs one job, tears its simulation down and reports how it ended"""
+
+	state = {}
+	try:
+		_job(_msg, rank, ranks, state, **job)
+		status = 'OK'
+	except _job_exit as e:
+		status = e.status
+	except Exception: # e.g. kernel fails to load, must not end serving
+		_msg(log = 'ERROR', msg = traceback.format_exc())
+		status = 'BAD'
+	finally:
+		gc.enable()
+
+	if 'simulation' in state:
+		try:
+			state.pop('simulation').stop()
+		except:
+			_msg(log = 'ERROR', msg = traceback.format_exc())
+			status = 'BAD'
+		gc.collect()
+
+	_msg(log = 'EXIT', msg = status)
+
+def _job(
+	_msg, rank, ranks, state,
+	kernel, scenario, scenario_param,
+	data_out_file, save_after_iteration, min_iterations, min_total_runtime,
+	ci_target, max_total_runtime, warmup, threads,
+	cc, cflags, cpus, pin, mpi, serve, platform_ref,
+	):
+	"""runs one simulation and reports on stdout, raises _job_exit on failure"""
+
+	def _step(warmup = False):
 		try:
 			gc.collect()
-			rt.start()
+			(wt if warmup else rt).start()
 			s.step()
-			rt_ = rt.stop()
+			rt_ = (wt if warmup else rt).stop()
 			gt.start()
 			gc.collect()
 			gt_ = gt.stop()
 		except:
 			_msg(log = 'ERROR', msg = traceback.format_exc())
-			_msg(log = 'EXIT', msg = 'BAD')
-			sys.exit()
+			raise _job_exit('BAD')
+		if 'first_step' not in startup: # time to first result
+			startup['first_step'] = rt_
+			_msg(log = 'STARTUP', **startup)
+		if warmup: # not a measurement
+			warmup_counter[0] += 1
+			_msg(log = 'WARMUP', runtime = rt_, gctime = gt_, counter = warmup_counter[0])
+			return rt_
 		counter[0] += 1
 		if counter[0] in save_after_iteration:
 			_store()
-		_msg(log = 'STEP', runtime = rt_, gctime = gt_, counter = counter[0])
+		stats = s.get_stats()
+		if len(stats) > 0:
+			_msg(log = 'STEP', runtime = rt_, gctime = gt_, counter = counter[0], stats = stats)
+		else:
+			_msg(log = 'STEP', runtime = rt_, gctime = gt_, counter = counter[0])
 		_msg(log = 'BEST_TIME', value = rt.min())
 
 	def _store():
@@ -141,24 +291,43 @@ def worker(
 			store_simulation(
 				s,
 				data_out_file,
-				'kernel={kernel:s};len={n:d};step={step:d}'.format(
+				'kernel={kernel:s};len={n:d};step={step:d}{warmup:s}'.format(
 					kernel = kernel,
 					scenario = scenario,
 					n = len(s),
 					step = counter[0],
+					# warm-up steps advance the simulation, too, but are not counted as steps
+					warmup = ';warmup={:d}'.format(warmup_counter[0]) if warmup_counter[0] > 0 else '',
 					),
 				)
 		except:
 			_msg(log = 'ERROR', msg = traceback.format_exc())
-			_msg(log = 'EXIT', msg = 'BAD')
-			sys.exit()
+			raise _job_exit('BAD')
 		_msg(log = 'PROCEDURE', msg = 'Data saved after step %d.' % counter[0])
 
 	_msg(log = 'START')
 
 	counter = [0]
-	scenario_param = json.loads(scenario_param)
-	threads = int(threads)
+	warmup_counter = [0]
+	startup = {} # ns per phase, see STARTUP log
+	scenario_param = json.loads(scenario_param) if isinstance(scenario_param, str) else scenario_param
+	threads_auto = threads == 'auto'
+	configure_build(cc = cc, cflags = cflags)
+	build = get_build_config()
+	try:
+		warmup = 'auto' if warmup == 'auto' else int(warmup)
+		if warmup != 'auto' and warmup < 0:
+			raise ValueError('number of warm-up steps must not be negative')
+		configure_affinity(cpus = parse_cpus(cpus), pin = pin)
+		if mpi: # one single-threaded process per rank
+			threads, threads_auto = ranks, False
+		else:
+			threads = _get_tuned_threads(kernel, scenario, scenario_param) if threads_auto else int(threads)
+		configure_threads(1 if mpi else threads)
+	except:
+		_msg(log = 'ERROR', msg = traceback.format_exc())
+		raise _job_exit('BAD')
+	affinity = get_affinity_config()
 
 	_msg(
 		log = 'INPUT',
@@ -168,70 +337,92 @@ def worker(
 			scenario_param = scenario_param,
 			min_iterations = min_iterations,
 			min_total_runtime = min_total_runtime,
+			ci_target = ci_target,
+			max_total_runtime = max_total_runtime if ci_target is not None else None,
+			warmup = warmup,
 			threads = threads,
+			threads_auto = threads_auto,
+			cc = build['cc'],
+			cflags = build['cflags'],
+			cpus = affinity['cpus'],
+			pin = affinity['pin'],
+			mpi = mpi,
+			serve = serve,
 			),
 		python = dict(
 			build = list(platform.python_build()),
 			compiler = platform.python_compiler(),
 			implementation = platform.python_implementation(),
 			version = list(sys.version_info),
+			executable = sys.executable,
+			gil = _is_gil_enabled(),
 			),
-		platform = dict(
-			system = platform.system(),
-			release = platform.release(),
-			version = platform.version(),
-			machine = platform.machine(),
-			processor = platform.processor(),
-			cores = psutil.cpu_count(logical = False),
-			threads = MAX_TREADS,
-			_cpu = cpuinfo.get_cpu_info() if CPUINFO else {},
-			_gpu = [
-				{
-					n: getattr(gpu, n)
-					for n in dir(gpu)
-					if not n.startswith('_') and n not in ('serial', 'uuid')
-					} for gpu in GPUtil.getGPUs()
-				] if GPUINFO else {},
-			),
+		platform = dict(ref = platform_ref) if platform_ref is not None else get_sysinfo(),
 		)
 
 	min_total_runtime *= 10**9 # convert to ns
+	max_total_runtime *= 10**9 # convert to ns
+	st = elapsed_timer()
 	inventory[kernel].load_module()
+	startup['load_module'] = st()
+
+	if mpi and not hasattr(inventory[kernel].get_class(), 'serve'):
+		_msg(log = 'ERROR', msg = 'kernel does not support MPI')
+		raise _job_exit('BAD')
+	if rank != 0:
+		inventory[kernel].get_class().serve() # follow rank 0 until it exits
+		sys.exit()
 
 	_msg(log = 'PROCEDURE', msg = 'Creating simulation ...')
 	try:
+		st = elapsed_timer()
 		s = create_simulation(
 			scenario = scenario,
 			universe_class = inventory[kernel].get_class(),
 			scenario_param = scenario_param,
 			threads = threads,
+			start = False,
 			)
+		startup['create_simulation'] = st()
+		st = elapsed_timer()
+		s.start()
+		startup['start_kernel'] = st()
 	except:
 		_msg(log = 'ERROR', msg = traceback.format_exc())
-		_msg(log = 'EXIT', msg = 'BAD')
-		sys.exit()
+		raise _job_exit('BAD')
+	state['simulation'] = s
 	_msg(log = 'PROCEDURE', msg = 'Simulation created.')
+	# Importing an incompatible extension (kernel module or start_kernel) re-enables the GIL
+	_msg(log = 'GIL', enabled = _is_gil_enabled())
+	_msg(log = 'THREADS', runtimes = get_runtime_threads(), mismatch = verify_threads(1 if mpi else threads))
 	_msg(log = 'SIZE', value = len(s))
 
 	rt = best_run_timer() # runtime
+	wt = best_run_timer() # warm-up runtime
 	gt = best_run_timer() # gc time
-	et = elapsed_timer() # elapsed time
 
 	gc.disable()
 
 	if 0 in save_after_iteration:
 		_store()
 
+	_warmup_steps(_msg, _step, warmup)
+
+	et = elapsed_timer() # elapsed time
+
 	# required min runs
 	for _ in range(min_iterations):
 		_step()
 
+	if ci_target is not None:
+		_adaptive_steps(_msg, _step, rt, et, ci_target, max_total_runtime)
+		return
+
 	# does elapsed time satisfy min_total_runtime?
 	et_ = et()
 	if et_ >= min_total_runtime:
 		_msg(log = 'PROCEDURE', msg = 'Minimum steps sufficient.')
-		_msg(log = 'EXIT', msg = 'OK')
-		sys.exit()
+		return
 
 	_msg(log = 'PROCEDURE', msg = 'Extra steps required.')
 	time_remaining = min_total_runtime - et_
@@ -241,15 +432,76 @@ def worker(
 	for _ in range(iterations_remaining):
 		_step()
 
-	_msg(log = 'EXIT', msg = 'OK')
-	sys.exit()
+def _get_tuned_threads(kernel, scenario, scenario_param):
+	"""returns cached thread count, tuning here would import and warm up the kernel before measuring"""
+	threads = get_tuned_threads(kernel, scenario, scenario_param, tune_missing = False)
+	if threads is None:
+		raise ValueError(
+			'no tuned thread count for kernel "{kernel:s}" and {size} bodies, '
+			'run `gravitation autotune -k {kernel:s}` first (with the same interpreter)'.format(
+				kernel = kernel, size = scenario_param.get('stars_len', 'default number of'),
+				))
+	return threads
+
+def _warmup_steps(_msg, _step, warmup):
+	"""
+	runs warm-up steps, e.g. JIT compilation, caches and first touch of memory: a fixed number or,
+	if "auto", until a step is within WARMUP_TOLERANCE of the step before (i.e. at least two).
+	Reports time in excess of the last warm-up step as compile time.
+	"""
+	if warmup == 0:
+		return
+	runtimes = []
+	detected = False if warmup == 'auto' else None # changepoint found, only if automatic
+	while len(runtimes) < (WARMUP_MAX if warmup == 'auto' else warmup):
+		runtimes.append(_step(warmup = True))
+		if warmup == 'auto' and len(runtimes) >= 2 and (
+			abs(runtimes[-1] - runtimes[-2]) <= WARMUP_TOLERANCE * runtimes[-1]
+			):
+			detected = True
+			break
+	_msg(
+		log = 'WARMUP_DONE',
+		steps = len(runtimes),
+		compile_time = max(0, sum(runtimes) - len(runtimes) * runtimes[-1]),
+		detected = detected,
+		)
+
+def _adaptive_steps(_msg, _step, rt, et, ci_target, max_total_runtime):
+	"""steps until confidence interval of median step runtime is narrow enough or time is up"""
+	converged = False
+	while True:
+		ci = rt.median_ci()
+		if ci is not None:
+			median = rt.median()
+			relative = (ci[1] - ci[0]) / (2 * median) if median > 0 else 0.0
+			converged = relative <= ci_target
+		if converged or et() >= max_total_runtime:
+			break
+		_step()
+	_msg(
+		log = 'CI',
+		median = rt.median(),
+		lower = ci[0] if ci is not None else None,
+		upper = ci[1] if ci is not None else None,
+		relative = relative if ci is not None else None,
+		target = ci_target,
+		converged = converged,
+		)
+	_msg(log = 'PROCEDURE', msg = 'Confidence interval %s.' % (
+		'sufficient' if converged else 'insufficient, maximum total runtime reached'
+		))
 
 def worker_command(
 	data_out_file, interpreter, kernel, scenario, scenario_param,
 	save_after_iteration, min_iterations, min_total_runtime, threads,
+	cc = None, cflags = None, cpus = None, pin = False, mpirun = None, serve = False,
+	ci_target = None, max_total_runtime = None, warmup = 0, platform_ref = None,
 	):
-	"""returns command list for use with subprocess.Popen"""
+	"""returns command list for use with subprocess.Popen, launched by mpirun if specified,
+	options are defaults for jobs if serving"""
 	return [
+		*(shlex.split(mpirun.format(threads = threads)) if mpirun else []),
 		interpreter, '-c', 'from gravitation.cli import cli; cli()', 'worker',
 		'--kernel', '%s' % kernel,
 		'--scenario', '%s' % scenario,
@@ -258,5 +510,15 @@ def worker_command(
 		*list(itertools.chain(*[('--save_after_iteration', '%d' % it) for it in save_after_iteration])),
 		'--min_iterations', '%d' % min_iterations,
 		'--min_total_runtime', '%d' % min_total_runtime,
-		'--threads', '%d' % threads,
+		*(['--ci_target', '%s' % ci_target] if ci_target is not None else []),
+		*(['--max_total_runtime', '%d' % max_total_runtime] if max_total_runtime is not None else []),
+		'--warmup', '%s' % warmup,
+		*(['--threads', '%s' % threads] if not mpirun else []), # MPI: ranks as launched by mpirun
+		*(['--cc', cc] if cc else []),
+		*(['--cflags', cflags] if cflags else []),
+		*(['--cpus', cpus] if cpus else []),
+		*(['--pin'] if pin else []),
+		*(['--mpi'] if mpirun else []),
+		*(['--serve'] if serve else []),
+		*(['--platform_ref', platform_ref] if platform_ref else []),
 		]
@@ -24,6 +24,12 @@ specific language governing rights and limitations under the License.
 
 """
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from ..lib.threads import get_threads, limit as limit_threads
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CONST
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -74,7 +80,7 @@ class universe_base:
 		scale_m = 1.0, # scaling factor for mass (for kg)
 		scale_r = 1.0, # scaling factor for distances (for m)
 		dtype = 'float32', # datatype for numerical computations
-		threads = 1, # maximum number of threads
+		threads = None, # maximum number of threads, defaults to lib.threads configuration
 		**kwargs # catch anything else
 		):
 		"""MUST NOT BE OVERLOADED!"""
@@ -89,7 +95,7 @@ class universe_base:
 		self._mass_list = []
 		self._state = STATE_PREINIT
 		self._dtype = dtype
-		self._threads = threads
+		self._threads = get_threads() if threads is None else threads
 		self._meta = kwargs
 
 	def __iter__(self):
@@ -126,6 +132,7 @@ class universe_base:
 		if self._state == STATE_STOPPED:
 			raise SyntaxError('simulation was stopped')
 		self._state = STATE_STARTED
+		limit_threads(self._threads)
 		self.start_kernel()
 
 	def start_kernel(self):
@@ -160,6 +167,11 @@ class universe_base:
 		MUST NOT BE OVERLOADED!"""
 		self._t += self._T
 
+	def get_stats(self):
+		"""returns kernel-specific statistics of the last step as a dict of numbers, e.g. overheads
+		CAN BE OVERLOADED!"""
+		return {}
+
 	def stop(self):
 		"""stops simulation
 		CAN BE CALLED ONCE: AFTER STEPPING!
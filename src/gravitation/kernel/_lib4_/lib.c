@@ -60,8 +60,11 @@ struct univ {
 	COUNTER_DATATYPE N;
 
 	UNIVERSUM_DATATYPE *AXmp, *AYmp, *AZmp;
+
+	// Row segments per thread (multiples of SSEI_OP) and number of threads, set by caller
+	// (see gravitation.lib.partition)
 	COUNTER_DATATYPE *j_min, *j_max;
-	COUNTER_DATATYPE seg_len, OPENMP_threadsmax;
+	COUNTER_DATATYPE OPENMP_threadsmax;
 
 };
 
@@ -73,82 +76,11 @@ static inline UNIVERSUM_DATATYPE_SSE SSEI_m128shift(UNIVERSUM_DATATYPE_SSE p)
 }
 
 
-void step_stage1_segmentation(struct univ *self)
-{
-
-	COUNTER_DATATYPE speicher, n, iter, j, z, zs;
-
-	(*self).OPENMP_threadsmax = omp_get_max_threads();
-	(*self).seg_len = ((*self).N * ((*self).N - 1)) / 2;
-
-	// Größe der Vektoren für Sprungmarken berechnen
-	speicher = (COUNTER_DATATYPE)sizeof(COUNTER_DATATYPE) * (COUNTER_DATATYPE)(*self).OPENMP_threadsmax;
-
-	// Speicher allozieren
-	(*self).j_min = (COUNTER_DATATYPE *)calloc(speicher, 1);
-	(*self).j_max = (COUNTER_DATATYPE *)calloc(speicher, 1);
-
-	// Paare je Thread
-	iter = (COUNTER_DATATYPE)floor((float)(*self).seg_len / (float)(*self).OPENMP_threadsmax);
-
-	// Threads zählen
-	n = 0;
-	// Paare je Thread zählen
-	z = 0;
-	// Alle Paare zählen
-	zs = 0;
-	// Erster Startpunkt
-	(*self).j_min[0] = 0;
-
-	// Sprunkpunkte ausrechnen
-	for(j = 0; j < (*self).N; j += SSEI_OP)
-	{
-
-		// Paare entsprechend SSEI_OP Schleifendurchläufen addieren
-		z = z + (SSEI_OP * ((*self).N - 1)) - (SSEI_OP * j) + ((SSEI_OP * (SSEI_OP - 1)) / 2);
-
-		// Genug Paare für den Thread?
-		if(z >= iter)
-		{
-
-			// Obergrenze des letzten Threads speichern
-			(*self).j_max[n] = j;
-
-			// Thread hochzählen
-			n++;
-
-			// Untergrenze des nächsten Threads speichern
-			(*self).j_min[n] = j;
-
-			// Zähler für alle Paare erhöhen
-			zs += z;
-
-			// Zähler auf Null
-			z = 0;
-
-			// Letzter Thread?
-			if(n + 1 == (*self).OPENMP_threadsmax)
-			{
-
-				// Letzte Obergrenze
-				(*self).j_max[n] = (*self).N;
-
-				break;
-
-			}
-
-		}
-
-	}
-
-}
-
-
 void step_stage1_calc(struct univ *self)
 {
 
 	// Iteration und Segmentierung
-	COUNTER_DATATYPE i, j, j_f, i_f, i_g, f, m, tn;
+	COUNTER_DATATYPE i, j, j_f, i_f, i_g, m, tn;
 
 	// Vektor für Abstand
 	UNIVERSUM_DATATYPE_SSE dx, dy, dz;
@@ -177,9 +109,10 @@ void step_stage1_calc(struct univ *self)
 	const UNIVERSUM_DATATYPE_SSE PHY_G_SSE = {(*self).G, (*self).G, (*self).G, (*self).G};
 
 	#pragma omp parallel \
+		num_threads((*self).OPENMP_threadsmax) \
 		default(none) \
-		private(m,tn,m_i,i,j,j_f,i_f,i_g,f,dx,dy,dz,dxx,dyy,dzz,dxyz,dxyzs,dnx,dny,dnz,PHY_Gdxyz,Ai,Aj,Xi,Yi,Zi,Xj,Yj,Zj,AXi,AYi,AZi,AXj,AYj,AZj,Mi,Mj) \
-		shared(self)
+		private(m,tn,m_i,i,j,j_f,i_f,i_g,dx,dy,dz,dxx,dyy,dzz,dxyz,dxyzs,dnx,dny,dnz,PHY_Gdxyz,Ai,Aj,Xi,Yi,Zi,Xj,Yj,Zj,AXi,AYi,AZi,AXj,AYj,AZj,Mi,Mj) \
+		shared(self,PHY_G_SSE)
 	{
 
 		// Thread-Nummer
@@ -192,54 +125,43 @@ void step_stage1_calc(struct univ *self)
 		for(j = (*self).j_min[tn]; j < (*self).j_max[tn]; j += SSEI_OP)
 		{
 
-			// Initialisierung eiens Durchlaufes der äußeren Schleife (Zeilen). Nimmt an, dass N durch SSEI_OP teilbar ist.
-			for(f = 0; f < SSEI_OP; f++)
+			// Initialisierung eines Durchlaufes der äußeren Schleife (Zeilen).
+			// Requires N to be a multiple of SSEI_OP and all arrays to be aligned to 16 bytes
+			// (padded with zero-mass bodies, see gravitation.kernel._mem_): aligned loads only.
+			Xj = _mm_load_ps(&(*self).X[j]);
+			Yj = _mm_load_ps(&(*self).Y[j]);
+			Zj = _mm_load_ps(&(*self).Z[j]);
+			Mj = _mm_load_ps(&(*self).M[j]);
+
+			// j-Beschleunigungen aus Null setzen
+			AXj = _mm_setzero_ps();
+			AYj = _mm_setzero_ps();
+			AZj = _mm_setzero_ps();
+
+			// i-vectors start at j + 1: shift j-vectors
+			Xi = SSEI_m128shift(Xj);
+			Yi = SSEI_m128shift(Yj);
+			Zi = SSEI_m128shift(Zj);
+			Mi = SSEI_m128shift(Mj);
+
+			// Load last element if there is one (otherwise it remains zero)
+			if(j + SSEI_OP < (*self).N)
 			{
 
-				// j + f ergibt Index im Speicher für j-Vektoren, j_f
-				j_f = j + f;
-
-				// Position und Masse für in j-Vektor schreiben (Vektor mit vier diagonalen initialisieren)
-				Xj[f] = (*self).X[j_f];
-				Yj[f] = (*self).Y[j_f];
-				Zj[f] = (*self).Z[j_f];
-				Mj[f] = (*self).M[j_f];
-
-				// j-Beschleunigungen aus Null setzen
-				AXj[f] = (UNIVERSUM_DATATYPE)0.0;
-				AYj[f] = (UNIVERSUM_DATATYPE)0.0;
-				AZj[f] = (UNIVERSUM_DATATYPE)0.0;
-
-				// j_f + 1 ergibt Index im Speicher für i-Vektoren, i_f
-				i_f = j_f + 1;
-
-				// Wenn N durch vier teilbar ist, entsteht hier IMMER ein leeres Element am Ende, was abgefangen werden muss
-				if(i_f < (*self).N)
-				{
-
-					// Position und Masse in i-Vektor schreiben
-					Xi[f] = (*self).X[i_f];
-					Yi[f] = (*self).Y[i_f];
-					Zi[f] = (*self).Z[i_f];
-					Mi[f] = (*self).M[i_f];
+				i_f = j + SSEI_OP;
 
-				} else {
-
-					// Position und Masse in i-Vektor schreiben
-					Xi[f] = (UNIVERSUM_DATATYPE)0.0;
-					Yi[f] = (UNIVERSUM_DATATYPE)0.0;
-					Zi[f] = (UNIVERSUM_DATATYPE)0.0;
-					Mi[f] = (UNIVERSUM_DATATYPE)0.0;
-
-				}
-
-				// i-Beschleunigungen aus Null setzen
-				AXi[f] = (UNIVERSUM_DATATYPE)0.0;
-				AYi[f] = (UNIVERSUM_DATATYPE)0.0;
-				AZi[f] = (UNIVERSUM_DATATYPE)0.0;
+				Xi[I_E] = (*self).X[i_f];
+				Yi[I_E] = (*self).Y[i_f];
+				Zi[I_E] = (*self).Z[i_f];
+				Mi[I_E] = (*self).M[i_f];
 
 			}
 
+			// i-Beschleunigungen aus Null setzen
+			AXi = _mm_setzero_ps();
+			AYi = _mm_setzero_ps();
+			AZi = _mm_setzero_ps();
+
 			// SPALTEN (i)
 			for(i = j + 1; i < (*self).N; i++)
 			{
@@ -317,18 +239,13 @@ void step_stage1_calc(struct univ *self)
 			}
 
 			// Abschluss eines Durchlaufes der äußeren Schleife (Zeilen)
-			for(f = 0; f < SSEI_OP; f++)
-			{
+			// j + m ergibt Index im Speicher für j-Vektoren, j_f (aligned)
+			j_f = j + m;
 
-				// j + f + m ergibt Index im Speicher für j-Vektoren, j_f
-				j_f = j + f + m;
-
-				// j-Beschleunigungen zurückschreiben
-				(*self).AXmp[j_f] += AXj[f];
-				(*self).AYmp[j_f] += AYj[f];
-				(*self).AZmp[j_f] += AZj[f];
-
-			}
+			// j-Beschleunigungen zurückschreiben
+			_mm_store_ps(&(*self).AXmp[j_f], _mm_add_ps(_mm_load_ps(&(*self).AXmp[j_f]), AXj));
+			_mm_store_ps(&(*self).AYmp[j_f], _mm_add_ps(_mm_load_ps(&(*self).AYmp[j_f]), AYj));
+			_mm_store_ps(&(*self).AZmp[j_f], _mm_add_ps(_mm_load_ps(&(*self).AZmp[j_f]), AZj));
 
 		}
 
@@ -340,35 +257,43 @@ void step_stage1_calc(struct univ *self)
 void step_stage1_reduction(struct univ *self)
 {
 
-	// Iteration und Segmentierung
-	COUNTER_DATATYPE m, mm, i, mi;
+	COUNTER_DATATYPE m, i, mi;
+	UNIVERSUM_DATATYPE ax, ay, az;
 
-	// Reduktion: Parallele Speicherbereiche zusammenführen
-	for(m = 0; m < (*self).OPENMP_threadsmax; m++)
+	// Reduction in parallel: each thread sums a slice of bodies across all per-thread buffers,
+	// overwrites the result and resets the buffers in the same pass
+	#pragma omp parallel for \
+		num_threads((*self).OPENMP_threadsmax) \
+		default(none) \
+		private(m,i,mi,ax,ay,az) \
+		shared(self) \
+		schedule(static)
+	for(i = 0; i < (*self).N; i++)
 	{
 
-		// Sprungweite brechnen
-		mm = m * (*self).N;
+		ax = 0;
+		ay = 0;
+		az = 0;
 
-		// Einmal je Thread durch alle Massen laufen
-		for(i = 0; i < (*self).N; i++)
+		for(m = 0; m < (*self).OPENMP_threadsmax; m++)
 		{
 
-			// Sprung-Index in parallelem Speicher
-			mi = i + mm;
+			mi = i + m * (*self).N;
 
-			// Beschleunigungen aus unterschiedlichen Speicherbereichen summieren
-			(*self).AX[i] += (*self).AXmp[mi];
-			(*self).AY[i] += (*self).AYmp[mi];
-			(*self).AZ[i] += (*self).AZmp[mi];
+			ax += (*self).AXmp[mi];
+			ay += (*self).AYmp[mi];
+			az += (*self).AZmp[mi];
 
-			// Parallele Speicherbereiche auf Null setzen
 			(*self).AXmp[mi] = 0;
 			(*self).AYmp[mi] = 0;
 			(*self).AZmp[mi] = 0;
 
 		}
 
+		(*self).AX[i] = ax;
+		(*self).AY[i] = ay;
+		(*self).AZ[i] = az;
+
 	}
 
 }
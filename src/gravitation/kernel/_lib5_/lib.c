@@ -0,0 +1,154 @@
+/* -*- coding: utf-8 -*- */
+
+/*
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/kernel/_lib5_/lib.c: C multi-thread core, full N x N matrix
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+*/
+
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <math.h>
+
+// Header for extended integer data types
+#include <stdint.h>
+
+#define UNIVERSUM_DATATYPE float
+#define COUNTER_DATATYPE long
+
+// Header for openMP
+#include <omp.h>
+
+struct univ {
+
+	// Gravitation INIT
+	UNIVERSUM_DATATYPE *X, *Y, *Z;
+	UNIVERSUM_DATATYPE *AX, *AY, *AZ;
+	UNIVERSUM_DATATYPE *M;
+
+	UNIVERSUM_DATATYPE G;
+
+	// Number of masses
+	COUNTER_DATATYPE N;
+
+	// Number of threads, set by caller
+	COUNTER_DATATYPE OPENMP_threadsmax;
+
+};
+
+
+// Accelerations of mass i caused by masses j_min to j_max - 1 (i not in range)
+static inline void step_stage1_segment(
+	struct univ *self,
+	COUNTER_DATATYPE i,
+	COUNTER_DATATYPE j_min,
+	COUNTER_DATATYPE j_max,
+	UNIVERSUM_DATATYPE *AXi,
+	UNIVERSUM_DATATYPE *AYi,
+	UNIVERSUM_DATATYPE *AZi
+	)
+{
+
+	COUNTER_DATATYPE j;
+
+	// Distance vector
+	UNIVERSUM_DATATYPE dx, dy, dz;
+	// Helpers for absolute distance
+	UNIVERSUM_DATATYPE dxyz, dxyzs;
+	// Normalized distance vector
+	UNIVERSUM_DATATYPE dnx, dny, dnz;
+	// Absolute acceleration
+	UNIVERSUM_DATATYPE Aj;
+	// Position of i and accumulators (kept in registers)
+	UNIVERSUM_DATATYPE Xi = (*self).X[i], Yi = (*self).Y[i], Zi = (*self).Z[i];
+	UNIVERSUM_DATATYPE ax = (UNIVERSUM_DATATYPE)0.0, ay = (UNIVERSUM_DATATYPE)0.0, az = (UNIVERSUM_DATATYPE)0.0;
+
+	for(j = j_min; j < j_max; j++)
+	{
+
+		// Distance vector
+		dx = Xi - (*self).X[j];
+		dy = Yi - (*self).Y[j];
+		dz = Zi - (*self).Z[j];
+
+		// Square of absolute distance
+		dxyz = dx * dx + dy * dy + dz * dz;
+
+		// Inverse of absolute distance
+		dxyzs = (UNIVERSUM_DATATYPE)1.0 / (UNIVERSUM_DATATYPE)sqrt(dxyz);
+
+		// Normalize distance vector (before multiplying, keeps values out of the denormal range)
+		dnx = dx * dxyzs;
+		dny = dy * dxyzs;
+		dnz = dz * dxyzs;
+
+		// Absolute acceleration of i
+		Aj = (*self).G * (*self).M[j] / dxyz;
+
+		// Accumulate acceleration of i
+		ax -= Aj * dnx;
+		ay -= Aj * dny;
+		az -= Aj * dnz;
+
+	}
+
+	*AXi += ax;
+	*AYi += ay;
+	*AZi += az;
+
+}
+
+
+void step_stage1(struct univ *self)
+{
+
+	COUNTER_DATATYPE i;
+
+	// Accumulated acceleration of i
+	UNIVERSUM_DATATYPE AXi, AYi, AZi;
+
+	// Every thread owns a block of rows and only ever writes to its own rows:
+	// No reduction buffers, no false sharing - at the price of computing every pair twice.
+	#pragma omp parallel for \
+		num_threads((*self).OPENMP_threadsmax) \
+		default(none) \
+		private(i,AXi,AYi,AZi) \
+		shared(self) \
+		schedule(static)
+	for(i = 0; i < (*self).N; i++)
+	{
+
+		AXi = (UNIVERSUM_DATATYPE)0.0;
+		AYi = (UNIVERSUM_DATATYPE)0.0;
+		AZi = (UNIVERSUM_DATATYPE)0.0;
+
+		// Two segments, skipping i itself, so the inner loops stay branch-free
+		step_stage1_segment(self, i, 0, i, &AXi, &AYi, &AZi);
+		step_stage1_segment(self, i, i + 1, (*self).N, &AXi, &AYi, &AZi);
+
+		(*self).AX[i] = AXi;
+		(*self).AY[i] = AYi;
+		(*self).AZ[i] = AZi;
+
+	}
+
+}
@@ -0,0 +1,296 @@
+/* -*- coding: utf-8 -*- */
+
+/*
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/kernel/_lib6_/lib.c: C multi-thread core, cache-tiled upper triangle
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+*/
+
+
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <math.h>
+
+// Header for extended integer data types
+#include <stdint.h>
+
+#define UNIVERSUM_DATATYPE float
+#define COUNTER_DATATYPE long
+
+// Header for openMP
+#include <omp.h>
+
+struct univ {
+
+	// Gravitation INIT
+	UNIVERSUM_DATATYPE *X, *Y, *Z;
+	UNIVERSUM_DATATYPE *AX, *AY, *AZ;
+	UNIVERSUM_DATATYPE *M;
+
+	UNIVERSUM_DATATYPE G;
+
+	// Number of masses
+	COUNTER_DATATYPE N;
+
+	// Per-thread accelerations
+	UNIVERSUM_DATATYPE *AXmp, *AYmp, *AZmp;
+
+	// Tiling: edge length of square tiles, number of tiles, tile coordinates (in tiles),
+	// set by caller, most expensive tiles first (see gravitation.lib.partition)
+	COUNTER_DATATYPE tile_len, tiles_len;
+	COUNTER_DATATYPE *tile_i, *tile_j;
+
+	// Tile-local acceleration buffers, per thread
+	UNIVERSUM_DATATYPE *tile_buf;
+
+	// Number of threads, set by caller
+	COUNTER_DATATYPE OPENMP_threadsmax;
+
+};
+
+
+void step_stage1_tiling(struct univ *self)
+{
+
+	// Six buffers (i and j for x, y, z) of tile_len per thread
+	(*self).tile_buf = (UNIVERSUM_DATATYPE *)calloc(
+		(*self).OPENMP_threadsmax * 6 * (*self).tile_len, sizeof(UNIVERSUM_DATATYPE)
+		);
+
+}
+
+
+void step_stage1_free(struct univ *self)
+{
+
+	free((*self).tile_buf);
+
+	(*self).tile_buf = NULL;
+
+}
+
+
+static inline void step_stage1_tile(
+	struct univ *self,
+	COUNTER_DATATYPE i_min, COUNTER_DATATYPE i_max,
+	COUNTER_DATATYPE j_min, COUNTER_DATATYPE j_max,
+	UNIVERSUM_DATATYPE *AXi, UNIVERSUM_DATATYPE *AYi, UNIVERSUM_DATATYPE *AZi,
+	UNIVERSUM_DATATYPE *AXj, UNIVERSUM_DATATYPE *AYj, UNIVERSUM_DATATYPE *AZj
+	)
+{
+
+	COUNTER_DATATYPE i, j, j_start;
+
+	// Distance vector
+	UNIVERSUM_DATATYPE dx, dy, dz;
+	// Normalized distance vector
+	UNIVERSUM_DATATYPE dnx, dny, dnz;
+	// Helpers for absolute distance
+	UNIVERSUM_DATATYPE dxyz, dxyzs;
+	// Gravitation helper
+	UNIVERSUM_DATATYPE PHY_Gdxyz;
+	// Absolute accelerations
+	UNIVERSUM_DATATYPE Ai, Aj;
+	// Position and mass of i, acceleration of i (kept in registers)
+	UNIVERSUM_DATATYPE Xi, Yi, Zi, Mi, ax, ay, az;
+
+	for(i = i_min; i < i_max; i++)
+	{
+
+		Xi = (*self).X[i];
+		Yi = (*self).Y[i];
+		Zi = (*self).Z[i];
+		Mi = (*self).M[i];
+
+		ax = (UNIVERSUM_DATATYPE)0.0;
+		ay = (UNIVERSUM_DATATYPE)0.0;
+		az = (UNIVERSUM_DATATYPE)0.0;
+
+		// Tiles on the diagonal only cover pairs above it
+		j_start = (j_min > i) ? j_min : i + 1;
+
+		for(j = j_start; j < j_max; j++)
+		{
+
+			// Distance vector
+			dx = Xi - (*self).X[j];
+			dy = Yi - (*self).Y[j];
+			dz = Zi - (*self).Z[j];
+
+			// Square of absolute distance
+			dxyz = dx * dx + dy * dy + dz * dz;
+
+			// Gravitational constant divided by square of absolute distance
+			PHY_Gdxyz = (*self).G / dxyz;
+
+			// Absolute accelerations
+			Ai = PHY_Gdxyz * (*self).M[j];
+			Aj = PHY_Gdxyz * Mi;
+
+			// Inverse of absolute distance
+			dxyzs = (UNIVERSUM_DATATYPE)1.0 / (UNIVERSUM_DATATYPE)sqrt(dxyz);
+
+			// Normalize distance vector
+			dnx = dx * dxyzs;
+			dny = dy * dxyzs;
+			dnz = dz * dxyzs;
+
+			// Accumulate acceleration of i
+			ax -= Ai * dnx;
+			ay -= Ai * dny;
+			az -= Ai * dnz;
+
+			// Accumulate acceleration of j in tile-local buffer
+			AXj[j - j_min] += Aj * dnx;
+			AYj[j - j_min] += Aj * dny;
+			AZj[j - j_min] += Aj * dnz;
+
+		}
+
+		AXi[i - i_min] += ax;
+		AYi[i - i_min] += ay;
+		AZi[i - i_min] += az;
+
+	}
+
+}
+
+
+void step_stage1_calc(struct univ *self)
+{
+
+	COUNTER_DATATYPE t, tn, m, k, i_min, i_max, j_min, j_max;
+	UNIVERSUM_DATATYPE *AXi, *AYi, *AZi, *AXj, *AYj, *AZj;
+
+	#pragma omp parallel \
+		default(none) \
+		private(t,tn,m,k,i_min,i_max,j_min,j_max,AXi,AYi,AZi,AXj,AYj,AZj) \
+		shared(self) \
+		num_threads((*self).OPENMP_threadsmax)
+	{
+
+		// Thread number
+		tn = (COUNTER_DATATYPE)omp_get_thread_num();
+
+		// Offset of thread in per-thread accelerations
+		m = tn * (*self).N;
+
+		// Tile-local buffers of thread
+		AXi = (*self).tile_buf + tn * 6 * (*self).tile_len;
+		AYi = AXi + (*self).tile_len;
+		AZi = AYi + (*self).tile_len;
+		AXj = AZi + (*self).tile_len;
+		AYj = AXj + (*self).tile_len;
+		AZj = AYj + (*self).tile_len;
+
+		// Tiles differ in cost (diagonal), hand them out dynamically
+		#pragma omp for schedule(dynamic, 1)
+		for(t = 0; t < (*self).tiles_len; t++)
+		{
+
+			i_min = (*self).tile_i[t] * (*self).tile_len;
+			i_max = i_min + (*self).tile_len;
+			if(i_max > (*self).N) i_max = (*self).N;
+
+			j_min = (*self).tile_j[t] * (*self).tile_len;
+			j_max = j_min + (*self).tile_len;
+			if(j_max > (*self).N) j_max = (*self).N;
+
+			// Reset tile-local buffers
+			for(k = 0; k < 6 * (*self).tile_len; k++)
+			{
+				AXi[k] = (UNIVERSUM_DATATYPE)0.0;
+			}
+
+			step_stage1_tile(self, i_min, i_max, j_min, j_max, AXi, AYi, AZi, AXj, AYj, AZj);
+
+			// Write tile partial sums back, once per tile
+			for(k = 0; k < i_max - i_min; k++)
+			{
+				(*self).AXmp[m + i_min + k] += AXi[k];
+				(*self).AYmp[m + i_min + k] += AYi[k];
+				(*self).AZmp[m + i_min + k] += AZi[k];
+			}
+			for(k = 0; k < j_max - j_min; k++)
+			{
+				(*self).AXmp[m + j_min + k] += AXj[k];
+				(*self).AYmp[m + j_min + k] += AYj[k];
+				(*self).AZmp[m + j_min + k] += AZj[k];
+			}
+
+		}
+
+	}
+
+}
+
+
+void step_stage1_reduction(struct univ *self)
+{
+
+	COUNTER_DATATYPE m, i, mi;
+	UNIVERSUM_DATATYPE ax, ay, az;
+
+	// Reduction in parallel: each thread sums a slice of bodies across all per-thread buffers,
+	// overwrites the result and resets the buffers in the same pass
+	#pragma omp parallel for \
+		num_threads((*self).OPENMP_threadsmax) \
+		default(none) \
+		private(m,i,mi,ax,ay,az) \
+		shared(self) \
+		schedule(static)
+	for(i = 0; i < (*self).N; i++)
+	{
+
+		ax = 0;
+		ay = 0;
+		az = 0;
+
+		for(m = 0; m < (*self).OPENMP_threadsmax; m++)
+		{
+
+			mi = i + m * (*self).N;
+
+			ax += (*self).AXmp[mi];
+			ay += (*self).AYmp[mi];
+			az += (*self).AZmp[mi];
+
+			(*self).AXmp[mi] = 0;
+			(*self).AYmp[mi] = 0;
+			(*self).AZmp[mi] = 0;
+
+		}
+
+		(*self).AX[i] = ax;
+		(*self).AY[i] = ay;
+		(*self).AZ[i] = az;
+
+	}
+
+}
+
+
+void step_stage1(struct univ *self)
+{
+	step_stage1_calc(self);
+	step_stage1_reduction(self);
+}
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/kernel/_mem_.py: Aligned and padded memory for SIMD kernels
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import ctypes
+
+try:
+	import numpy as np
+except ImportError: # kernels with plain ctypes-interface
+	np = None
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+ALIGN = 64 # bytes, cache line size and widest SIMD register (AVX512)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def padded_len(length, itemsize, align = ALIGN):
+	"""returns length rounded up to a multiple of the number of items per aligned block,
+	i.e. a multiple of any SIMD width up to align"""
+	items = align // itemsize
+	return -(-length // items) * items
+
+def aligned_array(ctype, length, align = ALIGN):
+	"""returns zeroed ctypes array of given length, aligned to align bytes"""
+	raw = (ctypes.c_char * (length * ctypes.sizeof(ctype) + align))()
+	offset = -ctypes.addressof(raw) % align
+	return (ctype * length).from_buffer(raw, offset) # keeps reference to raw
+
+def aligned_zeros(shape, dtype, order = 'C', align = ALIGN):
+	"""returns zeroed numpy array, aligned to align bytes"""
+	dtype = np.dtype(dtype)
+	nbytes = int(np.prod(shape)) * dtype.itemsize
+	raw = np.zeros((nbytes + align,), dtype = np.uint8)
+	offset = -raw.ctypes.data % align
+	return raw[offset:offset + nbytes].view(dtype).reshape(shape, order = order)
+
+def padding_positions(length, padded_length, extent):
+	"""returns positions for zero-mass padding bodies: distinct and far away from
+	the actual bodies (within extent), so no distance in the simulation becomes zero"""
+	extent = extent if extent > 0.0 else 1.0
+	return [
+		[4.0 * extent * (index + 1), 0.0, 0.0]
+		for index in range(padded_length - length)
+		]
@@ -33,6 +33,7 @@ __version__ = '0.0.1'
 __description__ = 'C-core, ctypes-interface'
 __requirements__ = []
 __externalrequirements__ = ['gcc']
+__libraries__ = ['_lib1_']
 __interpreters__ = ['python3']
 __parallel__ = False
 __license__ = 'GPLv2'
@@ -45,8 +46,8 @@ __authors__ = [
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 import ctypes
-import os
 
+from ..lib.build import load_library
 from ._base_ import universe_base
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -70,9 +71,7 @@ class universe(universe_base):
 				('G', self.CDTYPE),
 				('N', ctypes.c_long),
 				]
-		self._step_stage1_ = ctypes.cdll.LoadLibrary(
-			os.path.join(os.path.dirname(__file__), '_lib1_', 'lib.so')
-			).step_stage1
+		self._step_stage1_ = load_library('_lib1_').step_stage1
 		self._step_stage1_.argtypes = (ctypes.POINTER(univ),)
 		self.univ = univ()
 		for field in array_fields:
@@ -33,6 +33,7 @@ __version__ = '0.0.1'
 __description__ = 'C-core, SSE2-intrinsics, openMP-parallel, ctypes-interface'
 __requirements__ = []
 __externalrequirements__ = ['gcc']
+__libraries__ = ['_lib4_']
 __interpreters__ = ['python3']
 __parallel__ = True
 __license__ = 'GPLv2'
@@ -45,9 +46,17 @@ __authors__ = [
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 import ctypes
-import os
 
+from ..lib.build import load_library
+from ..lib.partition import row_ranges
 from ._base_ import universe_base
+from ._mem_ import aligned_array, padded_len, padding_positions
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+SSEI_OP = 4 # bodies per SSE vector, see _lib4_/lib.c
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CLASSES
@@ -60,11 +69,13 @@ class universe(universe_base):
 		self.CDTYPE = getattr(ctypes, 'c_{name:s}'.format(
 			name = {'float32': 'float', 'float64': 'double'}[self.DTYPE]
 			))
-		os.environ['OMP_NUM_THREADS'] = str(self._threads)
+		# Pad to SIMD width with zero-mass bodies
+		self.MASS_LEN = len(self)
+		self.MASS_PAD_LEN = padded_len(self.MASS_LEN, ctypes.sizeof(self.CDTYPE))
 		array_fields = ['X', 'Y', 'Z', 'AX', 'AY', 'AZ', 'M']
 		array_fields_mp = ['AXmp', 'AYmp', 'AZmp']
-		array_type = self.CDTYPE * len(self)
-		array_type_mp = self.CDTYPE * (len(self) * self._threads)
+		array_type = self.CDTYPE * self.MASS_PAD_LEN
+		array_type_mp = self.CDTYPE * (self.MASS_PAD_LEN * self._threads)
 		class univ(ctypes.Structure):
 			_fields_ = [
 				(field, ctypes.POINTER(array_type))
@@ -78,33 +89,36 @@ class universe(universe_base):
 				] + [
 				('j_min', ctypes.POINTER(ctypes.c_long)),
 				('j_max', ctypes.POINTER(ctypes.c_long)),
-				('seg_len', ctypes.c_long),
 				('OPENMP_threadsmax', ctypes.c_long),
 				]
-		lib = ctypes.cdll.LoadLibrary(
-			os.path.join(os.path.dirname(__file__), '_lib4_', 'lib.so')
-			)
-		self._step_stage1_segmentation_ = lib.step_stage1_segmentation
-		self._step_stage1_segmentation_.argtypes = (ctypes.POINTER(univ),)
+		lib = load_library('_lib4_')
 		self._step_stage1_ = lib.step_stage1
 		self._step_stage1_.argtypes = (ctypes.POINTER(univ),)
 		self.univ = univ()
+		# Aligned arrays, zeroed on allocation
 		for field in array_fields:
-			getattr(self.univ, field).contents = array_type()
+			setattr(self.univ, field, ctypes.pointer(aligned_array(self.CDTYPE, self.MASS_PAD_LEN)))
 		for field in array_fields_mp:
-			getattr(self.univ, field).contents = array_type_mp()
-		for i in range(len(self) * self._threads): # HACK
-			self.univ.AXmp.contents[i], self.univ.AYmp.contents[i], self.univ.AZmp.contents[i] = 0.0, 0.0, 0.0
+			setattr(self.univ, field, ctypes.pointer(aligned_array(self.CDTYPE, self.MASS_PAD_LEN * self._threads)))
 		for i, pm in enumerate(self._mass_list):
 			self.univ.M.contents[i] = pm._m
+		# Place zero-mass padding bodies (they never move)
+		for i, r in enumerate(padding_positions(
+			self.MASS_LEN, self.MASS_PAD_LEN,
+			max(abs(d) for pm in self._mass_list for d in pm._r),
+			), self.MASS_LEN):
+			self.univ.X.contents[i], self.univ.Y.contents[i], self.univ.Z.contents[i] = r
 		self.univ.G = self._G
-		self.univ.N = len(self)
-		self._step_stage1_segmentation_(self.univ)
+		self.univ.N = self.MASS_PAD_LEN
+		# Row segments of SIMD width with balanced numbers of pairs, one per thread
+		index_pool = row_ranges(self.MASS_PAD_LEN, self._threads, block = SSEI_OP)
+		self.univ.j_min = (ctypes.c_long * self._threads)(*[j_min for j_min, _ in index_pool])
+		self.univ.j_max = (ctypes.c_long * self._threads)(*[j_max for _, j_max in index_pool])
+		self.univ.OPENMP_threadsmax = self._threads
 
 	def step_stage1(self):
 		for i, pm in enumerate(self._mass_list):
 			self.univ.X.contents[i], self.univ.Y.contents[i], self.univ.Z.contents[i] = pm._r
-			self.univ.AX.contents[i], self.univ.AY.contents[i], self.univ.AZ.contents[i] = 0.0, 0.0, 0.0
 		self._step_stage1_(self.univ)
 		for i, pm in enumerate(self._mass_list):
 			pm._a[:] = [self.univ.AX.contents[i], self.univ.AY.contents[i], self.univ.AZ.contents[i]]
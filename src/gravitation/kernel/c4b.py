@@ -33,6 +33,7 @@ __version__ = '0.0.1'
 __description__ = 'C-core, SSE2-intrinsics, openMP-parallel, numpy-ctypes-interface'
 __requirements__ = ['numpy']
 __externalrequirements__ = ['gcc']
+__libraries__ = ['_lib4_']
 __interpreters__ = ['python3']
 __parallel__ = True
 __license__ = 'GPLv2'
@@ -45,11 +46,19 @@ __authors__ = [
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 import ctypes
-import os
 
 import numpy as np
 
+from ..lib.build import load_library
+from ..lib.partition import row_ranges
 from ._base_ import universe_base
+from ._mem_ import ALIGN, aligned_zeros, padded_len, padding_positions
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+SSEI_OP = 4 # bodies per SSE vector, see _lib4_/lib.c
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CLASSES
@@ -65,8 +74,8 @@ class universe(universe_base):
 		# Get const values
 		self.MASS_LEN = len(self)
 		self.SIM_DIM = len(self._mass_list[0]._r)
-		# Manage OpenMP
-		os.environ['OMP_NUM_THREADS'] = str(self._threads)
+		# Pad to SIMD width with zero-mass bodies
+		self.MASS_PAD_LEN = padded_len(self.MASS_LEN, ctypes.sizeof(self.CDTYPE))
 		# Build data structure
 		array_fields_r = ['X', 'Y', 'Z']
 		array_fields_a = ['AX', 'AY', 'AZ']
@@ -74,45 +83,40 @@ class universe(universe_base):
 		array_fields_amp = ['AXmp', 'AYmp', 'AZmp']
 		class univ(ctypes.Structure):
 			_fields_ = [
-				(field, ctypes.POINTER(self.CDTYPE * self.MASS_LEN))
+				(field, ctypes.POINTER(self.CDTYPE * self.MASS_PAD_LEN))
 				for field in (array_fields_r + array_fields_a + array_fields_m)
 				] + [
 				('G', self.CDTYPE),
 				('N', ctypes.c_long),
 				] + [
-				(field, ctypes.POINTER(self.CDTYPE * (self.MASS_LEN * self._threads)))
+				(field, ctypes.POINTER(self.CDTYPE * (self.MASS_PAD_LEN * self._threads)))
 				for field in array_fields_amp
 				] + [
 				('j_min', ctypes.POINTER(ctypes.c_long)),
 				('j_max', ctypes.POINTER(ctypes.c_long)),
-				('seg_len', ctypes.c_long),
 				('OPENMP_threadsmax', ctypes.c_long),
 				]
 		# Attach to library
-		lib = ctypes.cdll.LoadLibrary(
-			os.path.join(os.path.dirname(__file__), '_lib4_', 'lib.so')
-			)
-		self._step_stage1_segmentation_ = lib.step_stage1_segmentation
-		self._step_stage1_segmentation_.argtypes = (ctypes.POINTER(univ),)
+		lib = load_library('_lib4_')
 		self._step_stage1_ = lib.step_stage1
 		self._step_stage1_.argtypes = (ctypes.POINTER(univ),)
 
 
-		# Allocate memory: Object parameters
-		self.mass_r_array = np.zeros(
-			(self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F'
+		# Allocate memory: Object parameters (aligned and padded)
+		self.mass_r_array = aligned_zeros(
+			(self.MASS_PAD_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F'
 			)
-		self.mass_v_array = np.zeros(
-			(self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F'
+		self.mass_v_array = aligned_zeros(
+			(self.MASS_PAD_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F'
 			)
-		self.mass_a_array = np.zeros(
-			(self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F'
+		self.mass_a_array = aligned_zeros(
+			(self.MASS_PAD_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F'
 			)
-		self.mass_amp_array = np.zeros(
-			(self.MASS_LEN * self._threads, self.SIM_DIM), dtype = self.DTYPE, order = 'F'
+		self.mass_amp_array = aligned_zeros(
+			(self.MASS_PAD_LEN * self._threads, self.SIM_DIM), dtype = self.DTYPE, order = 'F'
 			)
-		self.mass_m_array = np.zeros(
-			(self.MASS_LEN,), dtype = self.DTYPE, order = 'F'
+		self.mass_m_array = aligned_zeros(
+			(self.MASS_PAD_LEN,), dtype = self.DTYPE, order = 'F'
 			)
 
 
@@ -125,7 +129,7 @@ class universe(universe_base):
 			]:
 			assert np_array.flags['F_CONTIGUOUS'] == True
 			assert np_array.flags['ALIGNED'] == True
-			assert np_array.flags['OWNDATA'] == True
+			assert np_array.ctypes.data % ALIGN == 0
 			# assert np_array.flags['FARRAY'] == True
 
 
@@ -138,6 +142,12 @@ class universe(universe_base):
 			self.mass_v_array[pm_index,:] = pm._v[:]
 			pm._v = self.mass_v_array[pm_index,:]
 			pm._a = self.mass_a_array[pm_index,:]
+		# Place zero-mass padding bodies
+		for pad_index, r in enumerate(padding_positions(
+			self.MASS_LEN, self.MASS_PAD_LEN,
+			float(np.abs(self.mass_r_array[:self.MASS_LEN,:]).max()),
+			)):
+			self.mass_r_array[self.MASS_LEN + pad_index,:] = r
 		# Fill data structure
 		self.univ = univ()
 		for index, (field_r, field_a) in enumerate(zip(array_fields_r, array_fields_a)):
@@ -145,21 +155,21 @@ class universe(universe_base):
 				self.univ,
 				field_r,
 				self.mass_r_array[:,index].ctypes.data_as(
-					ctypes.POINTER(self.CDTYPE * self.MASS_LEN)
+					ctypes.POINTER(self.CDTYPE * self.MASS_PAD_LEN)
 					)
 				)
 			setattr(
 				self.univ,
 				field_a,
 				self.mass_a_array[:,index].ctypes.data_as(
-					ctypes.POINTER(self.CDTYPE * self.MASS_LEN)
+					ctypes.POINTER(self.CDTYPE * self.MASS_PAD_LEN)
 					)
 				)
 		setattr(
 			self.univ,
 			array_fields_m[0],
 			self.mass_m_array.ctypes.data_as(
-				ctypes.POINTER(self.CDTYPE * self.MASS_LEN)
+				ctypes.POINTER(self.CDTYPE * self.MASS_PAD_LEN)
 				)
 			)
 		for index, field_amp in enumerate(array_fields_amp):
@@ -167,13 +177,16 @@ class universe(universe_base):
 				self.univ,
 				field_amp,
 				self.mass_amp_array[:,index].ctypes.data_as(
-					ctypes.POINTER(self.CDTYPE * (self.MASS_LEN * self._threads))
+					ctypes.POINTER(self.CDTYPE * (self.MASS_PAD_LEN * self._threads))
 					)
 				)
 		self.univ.G = self._G
-		self.univ.N = len(self._mass_list)
-		self._step_stage1_segmentation_(self.univ)
+		self.univ.N = self.MASS_PAD_LEN
+		# Row segments of SIMD width with balanced numbers of pairs, one per thread
+		index_pool = row_ranges(self.MASS_PAD_LEN, self._threads, block = SSEI_OP)
+		self.univ.j_min = (ctypes.c_long * self._threads)(*[j_min for j_min, _ in index_pool])
+		self.univ.j_max = (ctypes.c_long * self._threads)(*[j_max for _, j_max in index_pool])
+		self.univ.OPENMP_threadsmax = self._threads
 
 	def step_stage1(self):
-		self.mass_a_array[:,:] = 0.0
 		self._step_stage1_(self.univ)
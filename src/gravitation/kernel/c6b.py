@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/kernel/c6b.py: Kernel
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# KERNEL META
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+__longname__ = 'c-backend 6(b)'
+__version__ = '0.0.1'
+__description__ = 'C-core, cache-tiled, openMP-parallel, numpy-ctypes-interface'
+__requirements__ = ['numpy']
+__externalrequirements__ = ['gcc']
+__libraries__ = ['_lib6_']
+__interpreters__ = ['python3']
+__parallel__ = True
+__license__ = 'GPLv2'
+__authors__ = [
+	'Sebastian M. Ernst <ernst@pleiszenburg.de>',
+	]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import ctypes
+import os
+
+import numpy as np
+
+from ..lib.build import load_library
+from ..lib.partition import tiles
+from ._base_ import universe_base
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+L1_FALLBACK = 32 * 1024 # bytes, if cache size can not be determined
+TILE_ARRAYS = 7 # X, Y, Z, M plus three accelerations per body in a tile
+TILE_ROUND = 16 # tile lengths are multiples of this
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def get_l1_size():
+	"""returns size of L1 data cache in bytes"""
+	try:
+		size = os.sysconf('SC_LEVEL1_DCACHE_SIZE')
+		if size > 0:
+			return size
+	except (ValueError, OSError, AttributeError):
+		pass
+	path = '/sys/devices/system/cpu/cpu0/cache'
+	try:
+		for index in sorted(os.listdir(path)):
+			with open(os.path.join(path, index, 'level'), 'r') as f:
+				level = int(f.read().strip())
+			with open(os.path.join(path, index, 'type'), 'r') as f:
+				cache_type = f.read().strip()
+			if level != 1 or cache_type not in ('Data', 'Unified'):
+				continue
+			with open(os.path.join(path, index, 'size'), 'r') as f:
+				size = f.read().strip()
+			return int(size[:-1]) * 1024 if size.endswith('K') else int(size)
+	except (OSError, ValueError):
+		pass
+	return L1_FALLBACK
+
+def get_tile_len(itemsize):
+	"""returns default tile length: two tiles (i and j) fill half of L1"""
+	tile_len = get_l1_size() // (2 * 2 * TILE_ARRAYS * itemsize)
+	return max(TILE_ROUND, tile_len - tile_len % TILE_ROUND)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class universe(universe_base):
+
+	def start_kernel(self):
+		self.DTYPE = self._dtype
+		self.CDTYPE = getattr(ctypes, 'c_{name:s}'.format(
+			name = {'float32': 'float', 'float64': 'double'}[self.DTYPE]
+			))
+		# Get const values
+		self.MASS_LEN = len(self)
+		self.SIM_DIM = len(self._mass_list[0]._r)
+		self.TILE_LEN = int(self._meta.get(
+			'tile_len', get_tile_len(ctypes.sizeof(self.CDTYPE))
+			))
+		# Build data structure
+		array_fields_r = ['X', 'Y', 'Z']
+		array_fields_a = ['AX', 'AY', 'AZ']
+		array_fields_m = ['M']
+		array_fields_amp = ['AXmp', 'AYmp', 'AZmp']
+		class univ(ctypes.Structure):
+			_fields_ = [
+				(field, ctypes.POINTER(self.CDTYPE * self.MASS_LEN))
+				for field in (array_fields_r + array_fields_a + array_fields_m)
+				] + [
+				('G', self.CDTYPE),
+				('N', ctypes.c_long),
+				] + [
+				(field, ctypes.POINTER(self.CDTYPE * (self.MASS_LEN * self._threads)))
+				for field in array_fields_amp
+				] + [
+				('tile_len', ctypes.c_long),
+				('tiles_len', ctypes.c_long),
+				('tile_i', ctypes.POINTER(ctypes.c_long)),
+				('tile_j', ctypes.POINTER(ctypes.c_long)),
+				('tile_buf', ctypes.POINTER(self.CDTYPE)),
+				('OPENMP_threadsmax', ctypes.c_long),
+				]
+		# Attach to library
+		lib = load_library('_lib6_')
+		self._step_stage1_tiling_ = lib.step_stage1_tiling
+		self._step_stage1_tiling_.argtypes = (ctypes.POINTER(univ),)
+		self._step_stage1_free_ = lib.step_stage1_free
+		self._step_stage1_free_.argtypes = (ctypes.POINTER(univ),)
+		self._step_stage1_ = lib.step_stage1
+		self._step_stage1_.argtypes = (ctypes.POINTER(univ),)
+
+		# Allocate memory: Object parameters
+		self.mass_r_array = np.zeros(
+			(self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F'
+			)
+		self.mass_v_array = np.zeros(
+			(self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F'
+			)
+		self.mass_a_array = np.zeros(
+			(self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F'
+			)
+		self.mass_amp_array = np.zeros(
+			(self.MASS_LEN * self._threads, self.SIM_DIM), dtype = self.DTYPE, order = 'F'
+			)
+		self.mass_m_array = np.zeros(
+			(self.MASS_LEN,), dtype = self.DTYPE, order = 'F'
+			)
+
+		for np_array in [
+			self.mass_r_array,
+			self.mass_v_array,
+			self.mass_a_array,
+			self.mass_amp_array,
+			self.mass_m_array,
+			]:
+			assert np_array.flags['F_CONTIGUOUS'] == True
+			assert np_array.flags['ALIGNED'] == True
+			assert np_array.flags['OWNDATA'] == True
+
+		# Copy const data into Numpy infrastructure and link mass objects to Numpy views
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_m_array[pm_index] = pm._m
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_r_array[pm_index,:] = pm._r[:]
+			pm._r = self.mass_r_array[pm_index,:]
+			self.mass_v_array[pm_index,:] = pm._v[:]
+			pm._v = self.mass_v_array[pm_index,:]
+			pm._a = self.mass_a_array[pm_index,:]
+		# Fill data structure
+		self.univ = univ()
+		for index, (field_r, field_a) in enumerate(zip(array_fields_r, array_fields_a)):
+			setattr(
+				self.univ,
+				field_r,
+				self.mass_r_array[:,index].ctypes.data_as(
+					ctypes.POINTER(self.CDTYPE * self.MASS_LEN)
+					)
+				)
+			setattr(
+				self.univ,
+				field_a,
+				self.mass_a_array[:,index].ctypes.data_as(
+					ctypes.POINTER(self.CDTYPE * self.MASS_LEN)
+					)
+				)
+		setattr(
+			self.univ,
+			array_fields_m[0],
+			self.mass_m_array.ctypes.data_as(
+				ctypes.POINTER(self.CDTYPE * self.MASS_LEN)
+				)
+			)
+		for index, field_amp in enumerate(array_fields_amp):
+			setattr(
+				self.univ,
+				field_amp,
+				self.mass_amp_array[:,index].ctypes.data_as(
+					ctypes.POINTER(self.CDTYPE * (self.MASS_LEN * self._threads))
+					)
+				)
+		self.univ.G = self._G
+		self.univ.N = len(self._mass_list)
+		self.univ.tile_len = self.TILE_LEN
+		self.univ.OPENMP_threadsmax = self._threads
+		# Tile coordinates (in tiles), most expensive first for dynamic scheduling
+		tile_list = tiles(self.MASS_LEN, self.TILE_LEN)
+		self.univ.tiles_len = len(tile_list)
+		self.univ.tile_i = (ctypes.c_long * len(tile_list))(*[i_start // self.TILE_LEN for i_start, _, _, _ in tile_list])
+		self.univ.tile_j = (ctypes.c_long * len(tile_list))(*[j_start // self.TILE_LEN for _, _, j_start, _ in tile_list])
+		self._step_stage1_tiling_(self.univ)
+
+	def step_stage1(self):
+		self._step_stage1_(self.univ)
+
+	def stop_kernel(self):
+		self._step_stage1_free_(self.univ)
@@ -36,7 +36,6 @@ from cython.parallel import prange
 from cpython cimport array
 import array
 
-from libc.string cimport memset
 from libc.math cimport sqrt
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -52,7 +51,7 @@ cdef inline void _update_pair_c_(
 	float *m,
 	long SIM_DIM,
 	float G,
-	) nogil:
+	) noexcept nogil:
 
 	cdef float relative_rx, relative_ry, relative_rz
 	cdef float distance_sq, distance_inv, a_factor, a1, a2
@@ -96,7 +95,7 @@ cdef inline void _thread_worker_c_(
 	long *index_0, long *index_1,
 	long SIM_DIM,
 	float G,
-	) nogil:
+	) noexcept nogil:
 
 	# iteration index variables
 	cdef long index_i, index_j
@@ -117,6 +116,32 @@ cdef inline void _thread_worker_c_(
 			index_j += 1
 		index_i += 1
 
+cdef inline void _reduce_body_c_(
+	long index,
+	float *ax, float *ay, float *az,
+	float *axmp, float *aymp, float *azmp,
+	long CPU_LEN,
+	long SIM_DIM,
+	) noexcept nogil:
+
+	# iteration index variables
+	cdef long index_off, off_id
+	cdef float ax_sum = 0.0, ay_sum = 0.0, az_sum = 0.0
+
+	# sum per-thread a of one body, reset per-thread a in the same pass
+	for off_id in range(0, CPU_LEN):
+		index_off = SIM_DIM * off_id + index
+		ax_sum += axmp[index_off]
+		ay_sum += aymp[index_off]
+		az_sum += azmp[index_off]
+		axmp[index_off] = 0.0
+		aymp[index_off] = 0.0
+		azmp[index_off] = 0.0
+
+	ax[index] = ax_sum
+	ay[index] = ay_sum
+	az[index] = az_sum
+
 cdef void _step_stage1_c_(
 	float *rx, float *ry, float *rz,
 	float *ax, float *ay, float *az,
@@ -129,18 +154,10 @@ cdef void _step_stage1_c_(
 	):
 
 	# iteration index variables
-	cdef long index, index_off, offset, sim_len, mp_sim_len
-	cdef long worker_id, off_id
-
-	# reset a to zero
-	sim_len = SIM_DIM * sizeof(float)
-	memset(ax, 0, sim_len)
-	memset(ay, 0, sim_len)
-	memset(az, 0, sim_len)
-	mp_sim_len = CPU_LEN * sim_len
-	memset(axmp, 0, mp_sim_len)
-	memset(aymp, 0, mp_sim_len)
-	memset(azmp, 0, mp_sim_len)
+	cdef long index
+	cdef long worker_id
+
+	# per-thread a is zero on allocation and reset by the reduction below
 
 	# update all unique pairs
 	for worker_id in prange(
@@ -161,13 +178,21 @@ cdef void _step_stage1_c_(
 			G,
 			)
 
-	for off_id in range(0, CPU_LEN):
-		offset = SIM_DIM * off_id
-		for index in range(0, SIM_DIM):
-			index_off = offset + index
-			ax[index] += axmp[index_off]
-			ay[index] += aymp[index_off]
-			az[index] += azmp[index_off]
+	# reduce per-thread a in parallel, every thread sums a slice of bodies (overwrites a)
+	for index in prange(
+		0, SIM_DIM,
+		schedule = 'static',
+		num_threads = CPU_LEN,
+		nogil = True,
+		):
+
+		_reduce_body_c_(
+			index,
+			ax, ay, az,
+			axmp, aymp, azmp,
+			CPU_LEN,
+			SIM_DIM,
+			)
 
 def _step_stage1_(
 	array.array rx, array.array ry, array.array rz,
@@ -29,8 +29,8 @@ specific language governing rights and limitations under the License.
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 from array import array
-import os
 
+from ...lib.partition import row_ranges
 from .._base_ import universe_base
 from .core import _step_stage1_
 
@@ -49,7 +49,6 @@ class universe(universe_base):
 		self.SIM_DIM = len(self._mass_list[0]._r)
 
 		self.CPU_LEN = self._threads
-		os.environ['OMP_NUM_THREADS'] = str(self.CPU_LEN)
 
 		# Allocate memory: Object parameters
 		self.mass_r_array = [array(self.CDTYPE) for i in range(self.SIM_DIM)]
@@ -68,26 +67,10 @@ class universe(universe_base):
 					self.mass_amp_array[dim].append(0.0)
 			self.mass_m_array.append(pm._m)
 
-		# Compute line index intervals for evenly sized batches
-		total_pairs = (self.MASS_LEN * (self.MASS_LEN - 1)) // 2
-		batch_length = total_pairs // self.CPU_LEN
-		self.index_pool_0 = array('l')
-		self.index_pool_1 = array('l')
-		pair_count = 0
-		start_line = 0
-		for line in range(1, self.MASS_LEN - 1):
-			pair_count += (self.MASS_LEN - 1 - line)
-			if pair_count < batch_length:
-				continue
-			pair_count = 0
-			self.index_pool_0.append(start_line)
-			self.index_pool_1.append(line)
-			start_line = line
-		assert len(self.index_pool_0) in [(self.CPU_LEN - 1), self.CPU_LEN]
-		if len(self.index_pool_0) == self.CPU_LEN - 1:
-			self.index_pool_0.append(start_line)
-			self.index_pool_1.append(self.MASS_LEN - 1)
-		assert self.index_pool_1[-1] == self.MASS_LEN - 1
+		# Line index intervals for batches with balanced numbers of pairs
+		index_pool = row_ranges(self.MASS_LEN, self.CPU_LEN)
+		self.index_pool_0 = array('l', [i_start for i_start, _ in index_pool])
+		self.index_pool_1 = array('l', [i_end for _, i_end in index_pool])
 
 	def step_stage1(self):
 
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# cython: language_level=3, boundscheck=False
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/kernel/cy5/core.pyx: cy5 kernel cython core
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import cython
+
+from cython cimport floating
+from cython.parallel import prange, threadid
+
+from libc.math cimport sqrt
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef inline void _update_row_c_(
+	long index_i,
+	long thread_id,
+	floating[::1] rx, floating[::1] ry, floating[::1] rz,
+	floating[:, ::1] axmp, floating[:, ::1] aymp, floating[:, ::1] azmp,
+	floating[::1] m,
+	long MASS_LEN,
+	floating G,
+	) noexcept nogil:
+
+	cdef long index_j
+	cdef floating relative_rx, relative_ry, relative_rz
+	cdef floating distance_sq, distance_inv, a_factor, a1, a2
+	cdef floating axi = 0.0, ayi = 0.0, azi = 0.0
+	cdef floating one = 1.0
+
+	# one row of the upper triangle, accumulating "i" in registers
+	for index_j in range(index_i + 1, MASS_LEN):
+
+		relative_rx = rx[index_i] - rx[index_j]
+		relative_ry = ry[index_i] - ry[index_j]
+		relative_rz = rz[index_i] - rz[index_j]
+
+		distance_sq = (
+			(relative_rx * relative_rx)
+			+ (relative_ry * relative_ry)
+			+ (relative_rz * relative_rz)
+			)
+
+		distance_inv = one / sqrt(distance_sq)
+
+		relative_rx *= distance_inv
+		relative_ry *= distance_inv
+		relative_rz *= distance_inv
+
+		a_factor = G / distance_sq
+
+		a1 = a_factor * m[index_j]
+		a2 = a_factor * m[index_i]
+
+		axi -= relative_rx * a1
+		ayi -= relative_ry * a1
+		azi -= relative_rz * a1
+
+		axmp[thread_id, index_j] += relative_rx * a2
+		aymp[thread_id, index_j] += relative_ry * a2
+		azmp[thread_id, index_j] += relative_rz * a2
+
+	axmp[thread_id, index_i] += axi
+	aymp[thread_id, index_i] += ayi
+	azmp[thread_id, index_i] += azi
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline void _reduce_move_body_c_(
+	long index,
+	floating[::1] rx, floating[::1] ry, floating[::1] rz,
+	floating[::1] vx, floating[::1] vy, floating[::1] vz,
+	floating[::1] ax, floating[::1] ay, floating[::1] az,
+	floating[:, ::1] axmp, floating[:, ::1] aymp, floating[:, ::1] azmp,
+	long CPU_LEN,
+	floating T,
+	) noexcept nogil:
+
+	cdef long worker_id
+	cdef floating ax_sum = 0.0, ay_sum = 0.0, az_sum = 0.0
+
+	# sum per-thread a of one body, reset per-thread a in the same pass
+	for worker_id in range(0, CPU_LEN):
+		ax_sum += axmp[worker_id, index]
+		ay_sum += aymp[worker_id, index]
+		az_sum += azmp[worker_id, index]
+		axmp[worker_id, index] = 0.0
+		aymp[worker_id, index] = 0.0
+		azmp[worker_id, index] = 0.0
+
+	# stage 2 of one body: a *= T, v += a, r += v * T
+	ax[index] = ax_sum * T
+	ay[index] = ay_sum * T
+	az[index] = az_sum * T
+
+	vx[index] += ax[index]
+	vy[index] += ay[index]
+	vz[index] += az[index]
+
+	rx[index] += vx[index] * T
+	ry[index] += vy[index] * T
+	rz[index] += vz[index] * T
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _step_(
+	floating[::1] rx, floating[::1] ry, floating[::1] rz,
+	floating[::1] vx, floating[::1] vy, floating[::1] vz,
+	floating[::1] ax, floating[::1] ay, floating[::1] az,
+	floating[:, ::1] axmp, floating[:, ::1] aymp, floating[:, ::1] azmp,
+	floating[::1] m,
+	long CPU_LEN,
+	long CHUNK_LEN,
+	long MASS_LEN,
+	double G,
+	double T,
+	):
+
+	# iteration index variables
+	cdef long index, index_i
+	cdef floating G_ = <floating>G
+	cdef floating T_ = <floating>T
+
+	with nogil:
+
+		# per-thread a is zero on allocation and reset by the reduction below
+
+		# update all unique pairs, rows are handed out dynamically
+		for index_i in prange(
+			0, MASS_LEN - 1,
+			schedule = 'dynamic',
+			chunksize = CHUNK_LEN,
+			num_threads = CPU_LEN,
+			):
+
+			_update_row_c_(
+				index_i,
+				threadid(),
+				rx, ry, rz,
+				axmp, aymp, azmp,
+				m,
+				MASS_LEN,
+				G_,
+				)
+
+		# reduce per-thread a and move bodies in parallel, every thread owns a slice of bodies
+		# (overwrites a), r is not read by other threads after the pairs loop
+		for index in prange(
+			0, MASS_LEN,
+			schedule = 'static',
+			num_threads = CPU_LEN,
+			):
+
+			_reduce_move_body_c_(
+				index,
+				rx, ry, rz,
+				vx, vy, vz,
+				ax, ay, az,
+				axmp, aymp, azmp,
+				CPU_LEN,
+				T_,
+				)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/kernel/cy5/wrapper.py: cy5 kernel core wrapper
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import numpy as np
+
+from .._base_ import universe_base
+from .core import _step_
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+CHUNK_LEN = 16 # default number of rows handed to a thread at once
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class universe(universe_base):
+
+	def start_kernel(self):
+
+		self.DTYPE = self._dtype
+
+		self.MASS_LEN = len(self)
+		self.SIM_DIM = len(self._mass_list[0]._r)
+
+		self.CPU_LEN = self._threads
+		self.CHUNK_LEN = int(self._meta.get('chunksize', CHUNK_LEN))
+
+		# Allocate memory: Object parameters (columns are contiguous, i.e. SoA)
+		self.mass_r_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F')
+		self.mass_v_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F')
+		self.mass_a_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F')
+		self.mass_m_array = np.zeros((self.MASS_LEN,), dtype = self.DTYPE)
+		# Allocate memory: Per-thread accelerations
+		self.mass_amp_array = np.zeros((self.SIM_DIM, self.CPU_LEN, self.MASS_LEN), dtype = self.DTYPE)
+
+		# Copy const data into Numpy infrastructure and link mass objects to Numpy views
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_m_array[pm_index] = pm._m
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_r_array[pm_index,:] = pm._r[:]
+			pm._r = self.mass_r_array[pm_index,:]
+			self.mass_v_array[pm_index,:] = pm._v[:]
+			pm._v = self.mass_v_array[pm_index,:]
+			pm._a = self.mass_a_array[pm_index,:]
+
+		# Column views, passed as typed memoryviews
+		self.mass_r_views = [self.mass_r_array[:,dim] for dim in range(self.SIM_DIM)]
+		self.mass_v_views = [self.mass_v_array[:,dim] for dim in range(self.SIM_DIM)]
+		self.mass_a_views = [self.mass_a_array[:,dim] for dim in range(self.SIM_DIM)]
+		self.mass_amp_views = [self.mass_amp_array[dim,:,:] for dim in range(self.SIM_DIM)]
+
+	def step_stage1(self):
+
+		# Launch cython kernel core, works on state in place, also runs stage 2 without the GIL
+		_step_(
+			*self.mass_r_views,
+			*self.mass_v_views,
+			*self.mass_a_views,
+			*self.mass_amp_views,
+			self.mass_m_array,
+			self.CPU_LEN,
+			self.CHUNK_LEN,
+			self.MASS_LEN,
+			self._G,
+			self._T,
+			)
+
+	def step_stage2(self):
+		pass # done by step_stage1
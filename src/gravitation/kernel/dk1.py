@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/kernel/dk1.py: Kernel
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# KERNEL META
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+__longname__ = 'dask-backend [distributed] (1)'
+__version__ = '0.0.1'
+__description__ = 'numpy tiles as dask.distributed tasks, local cluster or any scheduler'
+__requirements__ = ['dask', 'distributed', 'numpy']
+__externalrequirements__ = []
+__interpreters__ = ['python3']
+__parallel__ = True
+__license__ = 'GPLv2'
+__authors__ = [
+	'Sebastian M. Ernst <ernst@pleiszenburg.de>',
+	]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import collections
+import logging
+import math
+
+from distributed import Client, LocalCluster, get_worker
+
+import numpy as np
+
+from ..lib.partition import tiles
+from ..lib.timing import time_ns
+from ._base_ import universe_base
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+SUBTILE_LEN = 128 # edge of blocks computed at once within a task, bounds temporary memory
+TASKS_PER_WORKER = 4 # default tile size targets this many tasks per worker and step
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _update_subtile(rt, m, G, i_start, i_end, j_start, j_end, a_i, a_j):
+	"""accelerations of one block of pairs, i.e. rows i_start:i_end against columns j_start:j_end"""
+	i_len, j_len = i_end - i_start, j_end - j_start
+	# r_j - r_i for all pairs of block
+	relative_r = rt[:, np.newaxis, j_start:j_end] - rt[:, i_start:i_end, np.newaxis]
+	distance_sq = np.add.reduce(relative_r * relative_r, axis = 0)
+	if i_start == j_start: # diagonal block: drop pairs (i, j) with j <= i, G / inf = 0
+		distance_sq[np.tril(np.ones((i_len, j_len), dtype = np.bool_))] = np.inf
+	# Normalize r_j - r_i (distance cubed overflows single precision)
+	np.divide(relative_r, np.sqrt(distance_sq)[np.newaxis, :, :], out = relative_r)
+	a_factor = G / distance_sq
+	# Accelerations of i and j
+	a_i += np.add.reduce(relative_r * (a_factor * m[np.newaxis, j_start:j_end])[np.newaxis, :, :], axis = 2)
+	a_j -= np.add.reduce(relative_r * (a_factor * m[i_start:i_end, np.newaxis])[np.newaxis, :, :], axis = 1)
+
+def _tile_task(rt, m, G, i_start, i_end, j_start, j_end, subtile_len):
+	"""
+	task: accelerations of rows i_start:i_end and columns j_start:j_end caused by pairs of one tile
+	(positions rt as (SIM_DIM, MASS_LEN)), returns both plus compute time and worker address
+	"""
+	start = time_ns()
+	SIM_DIM = rt.shape[0]
+	a_i = np.zeros((SIM_DIM, i_end - i_start), dtype = rt.dtype)
+	a_j = np.zeros((SIM_DIM, j_end - j_start), dtype = rt.dtype)
+	# Tiles are aligned to multiples of subtile_len, so blocks overlap the diagonal only if si == sj
+	for si in range(i_start, i_end, subtile_len):
+		ei = min(si + subtile_len, i_end)
+		for sj in range(max(si, j_start), j_end, subtile_len):
+			ej = min(sj + subtile_len, j_end)
+			_update_subtile(
+				rt, m, G, si, ei, sj, ej,
+				a_i[:, si - i_start:ei - i_start], a_j[:, sj - j_start:ej - j_start],
+				)
+	return a_i, a_j, time_ns() - start, get_worker().address
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class universe(universe_base):
+
+	def start_kernel(self):
+		self.DTYPE = self._dtype
+		# Get const values
+		self.MASS_LEN = len(self)
+		self.SIM_DIM = len(self._mass_list[0]._r)
+		self.CPU_LEN = self._threads
+		# Connect to scheduler or start local cluster, one single-threaded process per worker
+		scheduler = self._meta.get('scheduler', None)
+		if scheduler is None:
+			self.cluster = LocalCluster(
+				n_workers = self.CPU_LEN,
+				threads_per_worker = 1,
+				processes = True,
+				dashboard_address = None,
+				silence_logs = logging.CRITICAL, # worker logs are JSON on stdout and stderr
+				)
+			self.client = Client(self.cluster)
+		else:
+			self.cluster = None
+			self.client = Client(scheduler)
+		self.WORKER_LEN = len(self.client.scheduler_info()['workers'])
+		# Tiles: multiples of SUBTILE_LEN, about TASKS_PER_WORKER tiles per worker unless specified
+		tile_len = self._meta.get('tile_len', None)
+		if tile_len is None:
+			tile_len = self.MASS_LEN / math.sqrt(2 * TASKS_PER_WORKER * max(self.WORKER_LEN, 1))
+		self.TILE_LEN = max(1, math.ceil(int(tile_len) / SUBTILE_LEN)) * SUBTILE_LEN
+		self.tile_pool = tiles(self.MASS_LEN, self.TILE_LEN) # most expensive first
+		# Allocate memory: Object parameters, transposed views (SIM_DIM, MASS_LEN) are contiguous
+		self.mass_r_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F')
+		self.mass_v_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F')
+		self.mass_a_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F')
+		self.mass_m_array = np.zeros((self.MASS_LEN,), dtype = self.DTYPE)
+		self.mass_rt_array = self.mass_r_array.T
+		self.mass_at_array = self.mass_a_array.T
+		# Copy const data into Numpy infrastructure and link mass objects to Numpy views
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_m_array[pm_index] = pm._m
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_r_array[pm_index,:] = pm._r[:]
+			pm._r = self.mass_r_array[pm_index,:]
+			self.mass_v_array[pm_index,:] = pm._v[:]
+			pm._v = self.mass_v_array[pm_index,:]
+			pm._a = self.mass_a_array[pm_index,:]
+		# Masses are constant: scatter once
+		self.mass_m_future = self.client.scatter(self.mass_m_array, broadcast = True)
+		self.G = np.dtype(self.DTYPE).type(self._G)
+		# Allocate memory: Temporary variables
+		self.mass_vt_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F')
+		self.stats = {}
+
+	def step_stage1(self):
+		start = time_ns()
+		# Positions change every step: scatter to all workers before submitting tasks
+		mass_rt_future = self.client.scatter(self.mass_rt_array, broadcast = True, hash = False)
+		scattered = time_ns()
+		futures = [
+			self.client.submit(
+				_tile_task, mass_rt_future, self.mass_m_future, self.G, *tile, SUBTILE_LEN, pure = False,
+				)
+			for tile in self.tile_pool
+			]
+		results = self.client.gather(futures)
+		gathered = time_ns()
+		# Accumulate tiles
+		self.mass_at_array[:, :] = 0.0
+		busy = collections.defaultdict(int)
+		for (i_start, i_end, j_start, j_end), (a_i, a_j, compute, address) in zip(self.tile_pool, results):
+			self.mass_at_array[:, i_start:i_end] += a_i
+			self.mass_at_array[:, j_start:j_end] += a_j
+			busy[address] += compute
+		stop = time_ns()
+		# Compute on the busiest worker is the critical path, everything else is overhead
+		self.stats = dict(
+			tasks = len(futures),
+			workers = self.WORKER_LEN,
+			scatter = scattered - start,
+			compute = sum(busy.values()),
+			compute_max = max(busy.values()),
+			reduce = stop - gathered,
+			overhead = (gathered - scattered) - max(busy.values()),
+			)
+
+	def step_stage2(self):
+		np.multiply(self.mass_a_array, self._T, out = self.mass_a_array)
+		np.add(self.mass_v_array, self.mass_a_array, out = self.mass_v_array)
+		np.multiply(self.mass_v_array, self._T, out = self.mass_vt_array)
+		np.add(self.mass_r_array, self.mass_vt_array, out = self.mass_r_array)
+
+	def get_stats(self):
+		return self.stats
+
+	def stop_kernel(self):
+		self.client.close()
+		if self.cluster is not None:
+			self.cluster.close()
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/kernel/mpi1.py: Kernel
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# KERNEL META
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+__longname__ = 'mpi-backend [distributed] (1)'
+__version__ = '0.0.1'
+__description__ = 'numpy backend, one block of bodies per MPI rank, ring-systolic exchange of positions'
+__requirements__ = ['mpi4py', 'numpy']
+__externalrequirements__ = ['mpi']
+__interpreters__ = ['python3']
+__parallel__ = True
+__mpi__ = True
+__license__ = 'GPLv2'
+__authors__ = [
+	'Sebastian M. Ernst <ernst@pleiszenburg.de>',
+	]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import atexit
+
+from mpi4py import MPI
+
+import numpy as np
+
+from ..lib.threads import limit as limit_threads
+from ..lib.timing import time_ns
+from ._base_ import universe_base
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+CHUNK_LEN = 128 # own bodies computed at once against a block, bounds temporary memory
+ROOT = 0
+
+# Commands sent from root to all other ranks
+CMD_START = 'start'
+CMD_STEP = 'step'
+CMD_STOP = 'stop'
+CMD_EXIT = 'exit'
+
+MPI_DTYPE = {'float32': MPI.FLOAT, 'float64': MPI.DOUBLE}
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _block_ranges(length, parts):
+	"""contiguous blocks of (almost) equal length, every rank computes its bodies against all others"""
+	return [(length * part // parts, length * (part + 1) // parts) for part in range(parts)]
+
+def _update_block(mass_r_array, block, mass_a_array, G, diagonal, chunk_len):
+	"""accelerations of own bodies caused by one block of bodies (x, y, z, m), chunk by chunk"""
+	for c_start in range(0, mass_r_array.shape[0], chunk_len):
+		c_end = min(c_start + chunk_len, mass_r_array.shape[0])
+		relative_r = block[np.newaxis, :, :3] - mass_r_array[c_start:c_end, np.newaxis, :]
+		distance_sq = np.add.reduce(relative_r * relative_r, axis = 2)
+		if diagonal: # own block: skip pairs (i, i), G / inf = 0
+			distance_sq[np.arange(c_end - c_start), np.arange(c_start, c_end)] = np.inf
+		# Normalize r_j - r_i (distance cubed overflows single precision)
+		np.divide(relative_r, np.sqrt(distance_sq)[:, :, np.newaxis], out = relative_r)
+		a_factor = G * block[np.newaxis, :, 3] / distance_sq
+		mass_a_array[c_start:c_end] += np.add.reduce(relative_r * a_factor[:, :, np.newaxis], axis = 1)
+
+def _exit_ranks():
+	"""releases all other ranks from serving when root exits"""
+	MPI.COMM_WORLD.bcast((CMD_EXIT, None), root = ROOT)
+
+if MPI.COMM_WORLD.Get_rank() == ROOT:
+	atexit.register(_exit_ranks) # also if root fails before or while running a simulation
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class _ring:
+	"""state of one rank: own bodies plus two buffers for blocks travelling around the ring"""
+
+	def __init__(self, comm, MASS_LEN, SIM_DIM, DTYPE, G, CHUNK_LEN):
+		self.comm = comm
+		self.RANK, self.RANK_LEN = comm.Get_rank(), comm.Get_size()
+		self.MASS_LEN, self.SIM_DIM, self.DTYPE, self.CHUNK_LEN = MASS_LEN, SIM_DIM, DTYPE, CHUNK_LEN
+		self.G = np.dtype(DTYPE).type(G)
+		self.MPI_DTYPE = MPI_DTYPE[DTYPE]
+		self.block_ranges = _block_ranges(MASS_LEN, self.RANK_LEN)
+		self.block_lens = [end - start for start, end in self.block_ranges]
+		self.BLOCK_LEN = max(self.block_lens)
+		self.OWN_LEN = self.block_lens[self.RANK]
+		# Counts and displacements of blocks for scatter / gather of (MASS_LEN, SIM_DIM) arrays
+		self.counts_r = [length * SIM_DIM for length in self.block_lens]
+		self.displs_r = [start * SIM_DIM for start, _ in self.block_ranges]
+		# Allocate memory: own bodies, travelling blocks of (x, y, z, m)
+		self.mass_r_array = np.zeros((self.OWN_LEN, SIM_DIM), dtype = DTYPE)
+		self.mass_a_array = np.zeros((self.OWN_LEN, SIM_DIM), dtype = DTYPE)
+		self.mass_m_array = np.zeros((self.OWN_LEN,), dtype = DTYPE)
+		self.block_pool = [np.zeros((self.BLOCK_LEN, SIM_DIM + 1), dtype = DTYPE) for _ in range(2)]
+		self.stats = {}
+
+	def start(self, mass_m_array = None):
+		"""distributes masses from root, which are constant"""
+		self.comm.Scatterv(
+			[mass_m_array, self.block_lens, [start for start, _ in self.block_ranges], self.MPI_DTYPE]
+			if self.RANK == ROOT else None,
+			self.mass_m_array, root = ROOT,
+			)
+
+	def step(self, mass_r_array = None, mass_a_array = None):
+		"""computes accelerations: scatters positions from root, circulates blocks, gathers on root"""
+		start = time_ns()
+		self.comm.Scatterv(
+			[mass_r_array, self.counts_r, self.displs_r, self.MPI_DTYPE] if self.RANK == ROOT else None,
+			self.mass_r_array, root = ROOT,
+			)
+		scattered = time_ns()
+		right, left = (self.RANK + 1) % self.RANK_LEN, (self.RANK - 1) % self.RANK_LEN
+		# Own block starts travelling, masses travel along
+		block, block_next = self.block_pool
+		block[:self.OWN_LEN, :self.SIM_DIM] = self.mass_r_array
+		block[:self.OWN_LEN, self.SIM_DIM] = self.mass_m_array
+		self.mass_a_array[:, :] = 0.0
+		compute, wait = 0, 0
+		for shift in range(self.RANK_LEN):
+			# Pass current block on to the right while computing with it, receive next from the left
+			if shift < self.RANK_LEN - 1:
+				requests = [
+					self.comm.Isend([block, self.MPI_DTYPE], dest = right, tag = shift),
+					self.comm.Irecv([block_next, self.MPI_DTYPE], source = left, tag = shift),
+					]
+			compute_start = time_ns()
+			_update_block(
+				self.mass_r_array, block[:self.block_lens[(self.RANK - shift) % self.RANK_LEN]],
+				self.mass_a_array, self.G, shift == 0, self.CHUNK_LEN,
+				)
+			compute_end = time_ns()
+			if shift < self.RANK_LEN - 1:
+				MPI.Request.Waitall(requests)
+				block, block_next = block_next, block
+			wait += time_ns() - compute_end
+			compute += compute_end - compute_start
+		circulated = time_ns()
+		self.comm.Gatherv(
+			self.mass_a_array,
+			[mass_a_array, self.counts_r, self.displs_r, self.MPI_DTYPE] if self.RANK == ROOT else None,
+			root = ROOT,
+			)
+		self.stats = dict(
+			ranks = self.RANK_LEN,
+			scatter = scattered - start,
+			compute = compute,
+			wait = wait,
+			gather = time_ns() - circulated,
+			)
+
+class universe(universe_base):
+
+	def start_kernel(self):
+		self.DTYPE = self._dtype
+		limit_threads(1) # one single-threaded process per rank
+		self.comm = MPI.COMM_WORLD
+		if self.comm.Get_size() != self._threads:
+			raise ValueError('one MPI rank per thread required: %d ranks, %d threads' % (
+				self.comm.Get_size(), self._threads,
+				))
+		# Get const values
+		self.MASS_LEN = len(self)
+		self.SIM_DIM = len(self._mass_list[0]._r)
+		self.CHUNK_LEN = int(self._meta.get('chunksize', CHUNK_LEN))
+		# Allocate memory: Object parameters
+		self.mass_r_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE)
+		self.mass_v_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE)
+		self.mass_a_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE)
+		self.mass_m_array = np.zeros((self.MASS_LEN,), dtype = self.DTYPE)
+		# Copy const data into Numpy infrastructure and link mass objects to Numpy views
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_m_array[pm_index] = pm._m
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_r_array[pm_index,:] = pm._r[:]
+			pm._r = self.mass_r_array[pm_index,:]
+			self.mass_v_array[pm_index,:] = pm._v[:]
+			pm._v = self.mass_v_array[pm_index,:]
+			pm._a = self.mass_a_array[pm_index,:]
+		# Allocate memory: Temporary variables
+		self.mass_vt_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE)
+		# Start all other ranks, they serve until root exits
+		config = dict(
+			MASS_LEN = self.MASS_LEN, SIM_DIM = self.SIM_DIM, DTYPE = self.DTYPE, G = self._G,
+			CHUNK_LEN = self.CHUNK_LEN,
+			)
+		self.comm.bcast((CMD_START, config), root = ROOT)
+		self.ring = _ring(self.comm, **config)
+		self.ring.start(self.mass_m_array)
+
+	def step_stage1(self):
+		self.comm.bcast((CMD_STEP, None), root = ROOT)
+		self.ring.step(self.mass_r_array, self.mass_a_array)
+
+	def step_stage2(self):
+		np.multiply(self.mass_a_array, self._T, out = self.mass_a_array)
+		np.add(self.mass_v_array, self.mass_a_array, out = self.mass_v_array)
+		np.multiply(self.mass_v_array, self._T, out = self.mass_vt_array)
+		np.add(self.mass_r_array, self.mass_vt_array, out = self.mass_r_array)
+
+	def get_stats(self):
+		return self.ring.stats
+
+	def stop_kernel(self):
+		self.comm.bcast((CMD_STOP, None), root = ROOT)
+
+	@staticmethod
+	def serve():
+		"""runs simulations on all ranks but root as instructed by root, returns when root exits"""
+		comm = MPI.COMM_WORLD
+		if comm.Get_rank() == ROOT:
+			raise SyntaxError('root rank runs the simulation, it does not serve')
+		limit_threads(1)
+		ring = None
+		while True:
+			cmd, config = comm.bcast(None, root = ROOT)
+			if cmd == CMD_START:
+				ring = _ring(comm, **config)
+				ring.start()
+			elif cmd == CMD_STEP:
+				ring.step()
+			elif cmd == CMD_STOP:
+				ring = None
+			elif cmd == CMD_EXIT:
+				break
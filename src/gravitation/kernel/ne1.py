@@ -34,7 +34,7 @@ __description__ = 'pure numexpr backend, numpy only for holding data'
 __requirements__ = ['numexpr', 'numpy']
 __externalrequirements__ = []
 __interpreters__ = ['python3']
-__parallel__ = False
+__parallel__ = True
 __license__ = 'GPLv2'
 __authors__ = [
 	'Sebastian M. Ernst <ernst@pleiszenburg.de>',
@@ -58,7 +58,6 @@ class universe(universe_base):
 	def start_kernel(self):
 		self.DTYPE = self._dtype
 		self._G = getattr(np, self.DTYPE)(self._G)
-		ne.set_num_threads(ne.detect_number_of_cores())
 		# Get const values
 		self.MASS_LEN = len(self)
 		self.SIM_DIM = len(self._mass_list[0]._r)
@@ -48,13 +48,19 @@ import multiprocessing as mp
 
 import numpy as np
 
+from ..lib.affinity import pin_next_worker, worker_counter
+from ..lib.threads import configure as configure_threads
+from ..lib.partition import row_ranges
 from ._base_ import universe_base
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # ROUTINES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-def create_worker_context(m, G, SIM_DIM, MASS_LEN, DTYPE):
+def create_worker_context(counter, m, G, SIM_DIM, MASS_LEN, DTYPE):
+	# Pin worker process to its own core if requested, one thread per process
+	pin_next_worker(counter)
+	configure_threads(1)
 	# Store context information in global namespace of worker
 	global context
 	context = {
@@ -100,29 +106,14 @@ class universe(universe_base):
 		for pm_index, pm in enumerate(self._mass_list):
 			mass_m_array[pm_index] = pm._m
 
-		# Compute line index tuples for evenly sized batches
-		total_pairs = (self.MASS_LEN * (self.MASS_LEN - 1)) // 2
-		batch_length = total_pairs // self.CPU_LEN
-		self.index_pool = []
-		pair_count = 0
-		start_line = 0
-		for line in range(1, self.MASS_LEN - 1):
-			pair_count += (self.MASS_LEN - 1 - line)
-			if pair_count < batch_length:
-				continue
-			pair_count = 0
-			self.index_pool.append((start_line, line))
-			start_line = line
-		assert len(self.index_pool) in [(self.CPU_LEN - 1), self.CPU_LEN]
-		if len(self.index_pool) == self.CPU_LEN - 1:
-			self.index_pool.append((start_line, self.MASS_LEN - 1))
-		assert self.index_pool[-1][1] == self.MASS_LEN - 1
+		# Line index tuples for batches with balanced numbers of pairs
+		self.index_pool = row_ranges(self.MASS_LEN, self.CPU_LEN)
 
 		# Init multiprocessing pool
 		self.cpu_pool = mp.Pool(
 			processes = self.CPU_LEN,
 			initializer = create_worker_context,
-			initargs = (mass_m_array, self._G, self.SIM_DIM, self.MASS_LEN, self.DTYPE,),
+			initargs = (worker_counter(), mass_m_array, self._G, self.SIM_DIM, self.MASS_LEN, self.DTYPE,),
 			)
 
 	@staticmethod
@@ -163,10 +154,10 @@ class universe(universe_base):
 				args = (i_start, i_end, self.MASS_LEN, self.mass_r_array,)
 			) for i_start, i_end in self.index_pool
 			]
-		result_batches = [result.get() for result in pool_results]
-		# Reduce batches
-		for batch in result_batches[1:]:
-			np.add(result_batches[0], batch, out = result_batches[0])
+		# Reduce batches in place into the first one as they arrive, overlapping with remaining workers
+		mass_a_array = pool_results[0].get()
+		for result in pool_results[1:]:
+			np.add(mass_a_array, result.get(), out = mass_a_array)
 		# Push dynamic data back to Python infrastructure
 		for pm_index, pm in enumerate(self._mass_list):
-			pm._a[:] = result_batches[0][pm_index,:]
+			pm._a[:] = mass_a_array[pm_index,:]
@@ -29,8 +29,8 @@ specific language governing rights and limitations under the License.
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 __longname__ = 'numpy-backend [parallel] (4)'
-__version__ = '0.0.1'
-__description__ = 'numpy backend, parallel, joblib-IPC'
+__version__ = '0.0.2'
+__description__ = 'numpy backend, parallel, joblib-IPC, persistent workers, memmap'
 __requirements__ = ['joblib', 'numpy']
 __externalrequirements__ = []
 __interpreters__ = ['python3']
@@ -44,12 +44,85 @@ __authors__ = [
 # IMPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import os
+import shutil
+import tempfile
+
 import joblib
 
 import numpy as np
 
+from ..lib.affinity import pin_next_worker_in
+from ..lib.partition import row_ranges
+from ..lib.threads import configure as configure_threads
 from ._base_ import universe_base
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_context = {} # per worker process: memmaps and temporary variables, opened on first use
+
+def _get_context(path, MASS_LEN, SIM_DIM, CPU_LEN, DTYPE, G):
+	"""returns (cached) context of worker process for simulation state in path"""
+	if _context.get('path', None) == path:
+		return _context
+	_context.clear() # workers are reused across simulations
+	# Pin worker process to its own core if requested, once per simulation, one thread per process
+	pin_next_worker_in(path)
+	configure_threads(1)
+	_context.update({
+		'path': path,
+		'G': G,
+		# Object parameters: memmaps shared with main process
+		'mass_r_array': np.memmap(os.path.join(path, 'r'), dtype = DTYPE, mode = 'r', shape = (MASS_LEN, SIM_DIM)),
+		'mass_m_array': np.memmap(os.path.join(path, 'm'), dtype = DTYPE, mode = 'r', shape = (MASS_LEN,)),
+		'mass_amp_array': np.memmap(os.path.join(path, 'amp'), dtype = DTYPE, mode = 'r+', shape = (CPU_LEN, MASS_LEN, SIM_DIM)),
+		'mass_a_array': np.memmap(os.path.join(path, 'a'), dtype = DTYPE, mode = 'r+', shape = (MASS_LEN, SIM_DIM)),
+		# Allocate memory: Temporary variables
+		'relative_r': np.zeros((MASS_LEN - 1, SIM_DIM), dtype = DTYPE),
+		'distance_sq': np.zeros((MASS_LEN - 1,), dtype = DTYPE),
+		'distance_sqv': np.zeros((MASS_LEN - 1, SIM_DIM), dtype = DTYPE),
+		'distance_inv': np.zeros((MASS_LEN - 1,), dtype = DTYPE),
+		'a_factor': np.zeros((MASS_LEN - 1,), dtype = DTYPE),
+		'a1': np.zeros((MASS_LEN - 1,), dtype = DTYPE),
+		'a1r': np.zeros((MASS_LEN - 1, SIM_DIM), dtype = DTYPE),
+		'a1v': np.zeros((SIM_DIM,), dtype = DTYPE),
+		'a2': np.zeros((MASS_LEN - 1,), dtype = DTYPE),
+		'a2r': np.zeros((MASS_LEN - 1, SIM_DIM), dtype = DTYPE),
+		})
+	return _context
+
+def _update_pair(i, k, mass_a_array, data_set):
+	np.subtract(data_set['mass_r_array'][i,:], data_set['mass_r_array'][i+1:,:], out = data_set['relative_r'][:k])
+	np.multiply(data_set['relative_r'][:k], data_set['relative_r'][:k], out = data_set['distance_sqv'][:k])
+	np.add.reduce(data_set['distance_sqv'][:k], axis = 1, out = data_set['distance_sq'][:k])
+	np.sqrt(data_set['distance_sq'][:k], out = data_set['distance_inv'][:k])
+	np.divide(1.0, data_set['distance_inv'][:k], out = data_set['distance_inv'][:k])
+	np.multiply(data_set['relative_r'][:k], data_set['distance_inv'][:k].reshape(k, 1), out = data_set['relative_r'][:k])
+	np.divide(data_set['G'], data_set['distance_sq'][:k], out = data_set['a_factor'][:k])
+	np.multiply(data_set['a_factor'][:k], data_set['mass_m_array'][i+1:], out = data_set['a1'][:k])
+	np.multiply(data_set['a_factor'][:k], data_set['mass_m_array'][i], out = data_set['a2'][:k])
+	np.multiply(data_set['relative_r'][:k], data_set['a1'][:k].reshape(k, 1), out = data_set['a1r'][:k])
+	np.add.reduce(data_set['a1r'][:k], axis = 0, out = data_set['a1v'])
+	np.subtract(mass_a_array[i,:], data_set['a1v'], out = mass_a_array[i,:])
+	np.multiply(data_set['relative_r'][:k], data_set['a2'][:k].reshape(k, 1), out = data_set['a2r'][:k])
+	np.add(mass_a_array[i+1:,:], data_set['a2r'][:k], out = mass_a_array[i+1:,:])
+
+def _step_stage1_batch(batch_id, i_start, i_end, path, MASS_LEN, SIM_DIM, CPU_LEN, DTYPE, G):
+	data_set = _get_context(path, MASS_LEN, SIM_DIM, CPU_LEN, DTYPE, G)
+	# Slab of batch, zero on allocation and reset by _reduce_batch
+	mass_a_array = data_set['mass_amp_array'][batch_id]
+	# Run "pair" calculation: One object against vector of objects per iteration
+	for row in range(i_start, min(i_end, MASS_LEN - 1)):
+		_update_pair(row, MASS_LEN - 1 - row, mass_a_array, data_set) # max for temp arrays
+
+def _reduce_batch(start, end, path, MASS_LEN, SIM_DIM, CPU_LEN, DTYPE, G):
+	"""sums bodies [start, end) across all slabs into shared a, resets them in the same pass"""
+	data_set = _get_context(path, MASS_LEN, SIM_DIM, CPU_LEN, DTYPE, G)
+	np.add.reduce(data_set['mass_amp_array'][:, start:end, :], axis = 0, out = data_set['mass_a_array'][start:end, :])
+	data_set['mass_amp_array'][:, start:end, :] = 0.0
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CLASSES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -63,104 +136,69 @@ class universe(universe_base):
 		# Get const values
 		self.MASS_LEN = len(self)
 		self.SIM_DIM = len(self._mass_list[0]._r)
-
-		# Init multiprocessing pool
 		self.CPU_LEN = self._threads
+
+		# Allocate memory: Object parameters, memmaps shared with workers (RAM-backed if possible)
+		self.path = tempfile.mkdtemp(
+			prefix = 'gravitation_np4_', dir = '/dev/shm' if os.path.isdir('/dev/shm') else None,
+			)
+		self.mass_r_array = np.memmap(
+			os.path.join(self.path, 'r'), dtype = self.DTYPE, mode = 'w+', shape = (self.MASS_LEN, self.SIM_DIM),
+			)
+		self.mass_m_array = np.memmap(
+			os.path.join(self.path, 'm'), dtype = self.DTYPE, mode = 'w+', shape = (self.MASS_LEN,),
+			)
+		self.mass_amp_array = np.memmap(
+			os.path.join(self.path, 'amp'), dtype = self.DTYPE, mode = 'w+', shape = (self.CPU_LEN, self.MASS_LEN, self.SIM_DIM),
+			)
+		self.mass_a_array = np.memmap(
+			os.path.join(self.path, 'a'), dtype = self.DTYPE, mode = 'w+', shape = (self.MASS_LEN, self.SIM_DIM),
+			)
+
+		# Copy const data into Numpy infrastructure and link mass objects to Numpy views
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_m_array[pm_index] = pm._m
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_r_array[pm_index,:] = pm._r[:]
+			pm._r = self.mass_r_array[pm_index,:]
+			pm._a = self.mass_a_array[pm_index,:]
+
+		# Line index tuples for batches with balanced numbers of pairs
+		self.index_pool = row_ranges(self.MASS_LEN, self.CPU_LEN)
+		# Body index tuples for reduction, equal numbers of bodies
+		self.reduce_pool = [
+			(self.MASS_LEN * part // self.CPU_LEN, self.MASS_LEN * (part + 1) // self.CPU_LEN)
+			for part in range(self.CPU_LEN)
+			]
+
+		# Init persistent worker pool, left open until stop_kernel
 		self.cpu_pool = joblib.Parallel(
 			n_jobs = self.CPU_LEN,
 			prefer = 'processes' # alternative: 'threads'
 			)
-
-		self.data_pool = []
-
-		for _ in range(self.CPU_LEN):
-			self.data_pool.append({
-				# Allocate memory: Object parameters
-				'mass_r_array': np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE),
-				'mass_a_array': np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE),
-				'mass_m_array': np.zeros((self.MASS_LEN,), dtype = self.DTYPE),
-				# Allocate memory: Temporary variables
-				'relative_r': np.zeros((self.MASS_LEN - 1, self.SIM_DIM), dtype = self.DTYPE),
-				'distance_sq': np.zeros((self.MASS_LEN - 1,), dtype = self.DTYPE),
-				'distance_sqv': np.zeros((self.MASS_LEN - 1, self.SIM_DIM), dtype = self.DTYPE),
-				'distance_inv': np.zeros((self.MASS_LEN - 1,), dtype = self.DTYPE),
-				'a_factor': np.zeros((self.MASS_LEN - 1,), dtype = self.DTYPE),
-				'a1': np.zeros((self.MASS_LEN - 1,), dtype = self.DTYPE),
-				'a1r': np.zeros((self.MASS_LEN - 1, self.SIM_DIM), dtype = self.DTYPE),
-				'a1v': np.zeros((self.SIM_DIM,), dtype = self.DTYPE),
-				'a2': np.zeros((self.MASS_LEN - 1,), dtype = self.DTYPE),
-				'a2r': np.zeros((self.MASS_LEN - 1, self.SIM_DIM), dtype = self.DTYPE),
-				'G': self._G,
-				})
-
-		# Copy const data into Numpy infrastructure
-		for pm_index, pm in enumerate(self._mass_list):
-			self.data_pool[0]['mass_m_array'][pm_index] = pm._m
-		for data_set in self.data_pool[1:]:
-			data_set['mass_m_array'][:] = self.data_pool[0]['mass_m_array'][:]
-
-		# Compute line index tuples for evenly sized batches
-		total_pairs = (self.MASS_LEN * (self.MASS_LEN - 1)) // 2
-		batch_length = total_pairs // self.CPU_LEN
-		self.index_pool = []
-		pair_count = 0
-		start_line = 0
-		for line in range(1, self.MASS_LEN - 1):
-			pair_count += (self.MASS_LEN - 1 - line)
-			if pair_count < batch_length:
-				continue
-			pair_count = 0
-			self.index_pool.append((start_line, line))
-			start_line = line
-		assert len(self.index_pool) in [(self.CPU_LEN - 1), self.CPU_LEN]
-		if len(self.index_pool) == self.CPU_LEN - 1:
-			self.index_pool.append((start_line, self.MASS_LEN - 1))
-		assert self.index_pool[-1][1] == self.MASS_LEN - 1
-
-	@staticmethod
-	def update_pair(i, k, data_set):
-		np.subtract(data_set['mass_r_array'][i,:], data_set['mass_r_array'][i+1:,:], out = data_set['relative_r'][:k])
-		np.multiply(data_set['relative_r'][:k], data_set['relative_r'][:k], out = data_set['distance_sqv'][:k])
-		np.add.reduce(data_set['distance_sqv'][:k], axis = 1, out = data_set['distance_sq'][:k])
-		np.sqrt(data_set['distance_sq'][:k], out = data_set['distance_inv'][:k])
-		np.divide(1.0, data_set['distance_inv'][:k], out = data_set['distance_inv'][:k])
-		np.multiply(data_set['relative_r'][:k], data_set['distance_inv'][:k].reshape(k, 1), out = data_set['relative_r'][:k])
-		np.divide(data_set['G'], data_set['distance_sq'][:k], out = data_set['a_factor'][:k])
-		np.multiply(data_set['a_factor'][:k], data_set['mass_m_array'][i+1:], out = data_set['a1'][:k])
-		np.multiply(data_set['a_factor'][:k], data_set['mass_m_array'][i], out = data_set['a2'][:k])
-		np.multiply(data_set['relative_r'][:k], data_set['a1'][:k].reshape(k, 1), out = data_set['a1r'][:k])
-		np.add.reduce(data_set['a1r'][:k], axis = 0, out = data_set['a1v'])
-		np.subtract(data_set['mass_a_array'][i,:], data_set['a1v'], out = data_set['mass_a_array'][i,:])
-		np.multiply(data_set['relative_r'][:k], data_set['a2'][:k].reshape(k, 1), out = data_set['a2r'][:k])
-		np.add(data_set['mass_a_array'][i+1:,:], data_set['a2r'][:k], out = data_set['mass_a_array'][i+1:,:])
-
-	@staticmethod
-	def step_stage1_batch(i_start, i_end, mass_len, data_set):
-		# Run "pair" calculation: One object against vector of objects per iteration
-		for row in range(i_start, i_end):
-			universe.update_pair(row, mass_len - 1 - row, data_set) # max for temp arrays
-		# Return accumulated acceleration
-		return data_set['mass_a_array']
+		self.cpu_pool.__enter__()
 
 	def step_stage1(self):
-		# Zero out variables
-		for data_set in self.data_pool:
-			data_set['mass_a_array'][:, :] = 0.0
-		# Copy dynamic data to Numpy infrastructure
-		for pm_index, pm in enumerate(self._mass_list):
-			self.data_pool[0]['mass_r_array'][pm_index,:] = pm._r[:]
-		for data_set in self.data_pool[1:]:
-			data_set['mass_r_array'][:,:] = self.data_pool[0]['mass_r_array'][:,:]
-		# Run "pair" calculation: One object against vector of objects per iteration
-		result_batches = self.cpu_pool(
-			joblib.delayed(universe.step_stage1_batch)(
-				i_start, i_end, self.MASS_LEN, data_set
+		# Run "pair" calculation, only row ranges and memmap path are sent to workers
+		self.cpu_pool(
+			joblib.delayed(_step_stage1_batch)(
+				batch_id, i_start, i_end, self.path, self.MASS_LEN, self.SIM_DIM, self.CPU_LEN, self.DTYPE, self._G,
 				)
-			for (i_start, i_end), data_set in zip(self.index_pool, self.data_pool)
+			for batch_id, (i_start, i_end) in enumerate(self.index_pool)
 			)
-		# Reduce batches
-		for batch in result_batches[1:]:
-			np.add(result_batches[0], batch, out = result_batches[0])
-		# Push dynamic data back to Python infrastructure
-		for pm_index, pm in enumerate(self._mass_list):
-			pm._a[:] = result_batches[0][pm_index,:]
+		# Reduce batches in parallel, every worker sums a slice of bodies (overwrites a)
+		self.cpu_pool(
+			joblib.delayed(_reduce_batch)(
+				start, end, self.path, self.MASS_LEN, self.SIM_DIM, self.CPU_LEN, self.DTYPE, self._G,
+				)
+			for start, end in self.reduce_pool
+			)
+
+	def stop_kernel(self):
+		self.cpu_pool.__exit__(None, None, None)
+		# Drop views into memmaps, then remove files
+		for pm in self._mass_list:
+			pm._r = [float(x) for x in pm._r]
+			pm._a = [float(x) for x in pm._a]
+		del self.mass_r_array, self.mass_m_array, self.mass_amp_array, self.mass_a_array
+		shutil.rmtree(self.path, ignore_errors = True)
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/kernel/np5.py: Kernel
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# KERNEL META
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+__longname__ = 'numpy-backend [parallel] (5)'
+__version__ = '0.0.1'
+__description__ = 'numpy backend, parallel, persistent processes, shared memory'
+__requirements__ = ['numpy']
+__externalrequirements__ = []
+__interpreters__ = ['python3']
+__parallel__ = True
+__license__ = 'GPLv2'
+__authors__ = [
+	'Sebastian M. Ernst <ernst@pleiszenburg.de>',
+	]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait as wait_connections
+import threading
+
+import numpy as np
+
+from ..lib.affinity import pin_worker
+from ..lib.partition import row_ranges
+from ..lib.threads import configure as configure_threads
+from ._base_ import universe_base
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+POLL_TIMEOUT = 1.0 # seconds between checks of worker processes
+JOIN_TIMEOUT = 10.0 # seconds to wait for a worker to exit before terminating it
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _attach_array(name, shape, dtype):
+	"""attaches to shared memory segment, returns segment and numpy view"""
+	shm = shared_memory.SharedMemory(name = name)
+	return shm, np.ndarray(shape, dtype = dtype, buffer = shm.buf)
+
+def _worker(
+	worker_id, i_start, i_end, segments, MASS_LEN, SIM_DIM, CPU_LEN, DTYPE, G,
+	start_barrier, done_barrier, stop_flag,
+	):
+	"""persistent worker: waits for start signal, computes its rows into its own slab, signals done"""
+
+	pin_worker(worker_id)
+	configure_threads(1)
+
+	shm_r, mass_r_array = _attach_array(segments['r'], (MASS_LEN, SIM_DIM), DTYPE)
+	shm_m, mass_m_array = _attach_array(segments['m'], (MASS_LEN,), DTYPE)
+	shm_a, mass_amp_array = _attach_array(segments['a'], (CPU_LEN, MASS_LEN, SIM_DIM), DTYPE)
+	mass_a_array = mass_amp_array[worker_id]
+
+	# Allocate memory: Temporary variables (private to worker)
+	relative_r = np.zeros((MASS_LEN - 1, SIM_DIM), dtype = DTYPE)
+	distance_sq = np.zeros((MASS_LEN - 1,), dtype = DTYPE)
+	distance_sqv = np.zeros((MASS_LEN - 1, SIM_DIM), dtype = DTYPE)
+	distance_inv = np.zeros((MASS_LEN - 1,), dtype = DTYPE)
+	a_factor = np.zeros((MASS_LEN - 1,), dtype = DTYPE)
+	a1 = np.zeros((MASS_LEN - 1,), dtype = DTYPE)
+	a1r = np.zeros((MASS_LEN - 1, SIM_DIM), dtype = DTYPE)
+	a1v = np.zeros((SIM_DIM,), dtype = DTYPE)
+	a2 = np.zeros((MASS_LEN - 1,), dtype = DTYPE)
+	a2r = np.zeros((MASS_LEN - 1, SIM_DIM), dtype = DTYPE)
+
+	try:
+		while True:
+			start_barrier.wait()
+			if stop_flag.value:
+				break
+			# Zero-out own slab
+			mass_a_array[:, :] = 0.0
+			# Run "pair" calculation: One object against vector of objects per iteration
+			for i in range(i_start, i_end):
+				k = MASS_LEN - 1 - i
+				if k == 0:
+					continue
+				np.subtract(mass_r_array[i,:], mass_r_array[i+1:,:], out = relative_r[:k])
+				np.multiply(relative_r[:k], relative_r[:k], out = distance_sqv[:k])
+				np.add.reduce(distance_sqv[:k], axis = 1, out = distance_sq[:k])
+				np.sqrt(distance_sq[:k], out = distance_inv[:k])
+				np.divide(1.0, distance_inv[:k], out = distance_inv[:k])
+				np.multiply(relative_r[:k], distance_inv[:k].reshape(k, 1), out = relative_r[:k])
+				np.divide(G, distance_sq[:k], out = a_factor[:k])
+				np.multiply(a_factor[:k], mass_m_array[i+1:], out = a1[:k])
+				np.multiply(a_factor[:k], mass_m_array[i], out = a2[:k])
+				np.multiply(relative_r[:k], a1[:k].reshape(k, 1), out = a1r[:k])
+				np.add.reduce(a1r[:k], axis = 0, out = a1v)
+				np.subtract(mass_a_array[i,:], a1v, out = mass_a_array[i,:])
+				np.multiply(relative_r[:k], a2[:k].reshape(k, 1), out = a2r[:k])
+				np.add(mass_a_array[i+1:,:], a2r[:k], out = mass_a_array[i+1:,:])
+			done_barrier.wait()
+	except:
+		# Wake up main process (BrokenBarrierError) instead of leaving it waiting forever
+		start_barrier.abort()
+		done_barrier.abort()
+		raise
+	finally:
+		del mass_r_array, mass_m_array, mass_a_array, mass_amp_array # release buffers before closing
+		for shm in (shm_r, shm_m, shm_a):
+			shm.close()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class universe(universe_base):
+
+	def start_kernel(self):
+
+		self.DTYPE = self._dtype
+
+		# Get const values
+		self.MASS_LEN = len(self)
+		self.SIM_DIM = len(self._mass_list[0]._r)
+		self.CPU_LEN = self._threads
+		itemsize = np.dtype(self.DTYPE).itemsize
+
+		# Allocate shared memory: positions, masses, one acceleration slab per worker
+		self.shm_dict = {
+			'r': shared_memory.SharedMemory(create = True, size = self.MASS_LEN * self.SIM_DIM * itemsize),
+			'm': shared_memory.SharedMemory(create = True, size = self.MASS_LEN * itemsize),
+			'a': shared_memory.SharedMemory(create = True, size = self.CPU_LEN * self.MASS_LEN * self.SIM_DIM * itemsize),
+			}
+		self.mass_r_array = np.ndarray((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, buffer = self.shm_dict['r'].buf)
+		self.mass_m_array = np.ndarray((self.MASS_LEN,), dtype = self.DTYPE, buffer = self.shm_dict['m'].buf)
+		self.mass_amp_array = np.ndarray(
+			(self.CPU_LEN, self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, buffer = self.shm_dict['a'].buf
+			)
+		self.mass_amp_array[:, :, :] = 0.0
+
+		# Allocate memory: Object parameters (private to main process)
+		self.mass_v_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE)
+		self.mass_a_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE)
+		self.mass_vt_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE)
+
+		# Copy const data into Numpy infrastructure and link mass objects to Numpy views
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_m_array[pm_index] = pm._m
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_r_array[pm_index,:] = pm._r[:]
+			pm._r = self.mass_r_array[pm_index,:]
+			self.mass_v_array[pm_index,:] = pm._v[:]
+			pm._v = self.mass_v_array[pm_index,:]
+			pm._a = self.mass_a_array[pm_index,:]
+
+		# Start persistent workers, one row range each
+		self.start_barrier = mp.Barrier(self.CPU_LEN + 1)
+		self.done_barrier = mp.Barrier(self.CPU_LEN + 1)
+		self.stop_flag = mp.Value('b', 0)
+		self.cpu_pool = [
+			mp.Process(
+				target = _worker,
+				args = (
+					worker_id, i_start, i_end,
+					{name: shm.name for name, shm in self.shm_dict.items()},
+					self.MASS_LEN, self.SIM_DIM, self.CPU_LEN, self.DTYPE, self._G,
+					self.start_barrier, self.done_barrier, self.stop_flag,
+					),
+				daemon = True,
+				)
+			for worker_id, (i_start, i_end) in enumerate(row_ranges(self.MASS_LEN, self.CPU_LEN))
+			]
+		for process in self.cpu_pool:
+			process.start()
+
+		# Watch workers: a worker killed hard (OOM killer, signal, segfault) never reaches a barrier
+		self.stopping = threading.Event()
+		self.watchdog = threading.Thread(target = self._watch_workers, daemon = True)
+		self.watchdog.start()
+
+	def _watch_workers(self):
+		"""aborts barriers if a worker exits while the kernel is running, waking the main process"""
+		while not self.stopping.is_set():
+			wait_connections([process.sentinel for process in self.cpu_pool], timeout = POLL_TIMEOUT)
+			if self.stopping.is_set():
+				break
+			if any(process.exitcode is not None for process in self.cpu_pool):
+				self.start_barrier.abort()
+				self.done_barrier.abort()
+				break
+
+	def _wait(self, barrier):
+		"""waits for workers at barrier, raises if a worker died or failed"""
+		try:
+			barrier.wait()
+		except threading.BrokenBarrierError:
+			raise RuntimeError('np5 worker(s) failed, exit codes: %s' % ', '.join(
+				str(process.exitcode) for process in self.cpu_pool
+				))
+
+	def step_stage1(self):
+		# Positions are already in shared memory: signal workers and wait for them
+		self._wait(self.start_barrier)
+		self._wait(self.done_barrier)
+		# Reduce slabs
+		np.add.reduce(self.mass_amp_array, axis = 0, out = self.mass_a_array)
+
+	def step_stage2(self):
+		np.multiply(self.mass_a_array, self._T, out = self.mass_a_array)
+		np.add(self.mass_v_array, self.mass_a_array, out = self.mass_v_array)
+		np.multiply(self.mass_v_array, self._T, out = self.mass_vt_array)
+		np.add(self.mass_r_array, self.mass_vt_array, out = self.mass_r_array)
+
+	def stop_kernel(self):
+		# Release workers from start barrier with stop flag set
+		self.stopping.set()
+		self.stop_flag.value = 1
+		if not self.start_barrier.broken and all(process.is_alive() for process in self.cpu_pool):
+			try:
+				self.start_barrier.wait(timeout = JOIN_TIMEOUT)
+			except threading.BrokenBarrierError:
+				pass
+		for process in self.cpu_pool:
+			process.join(timeout = JOIN_TIMEOUT)
+			if process.is_alive(): # stuck, e.g. waiting at a barrier for a dead sibling
+				process.terminate()
+				process.join()
+		self.watchdog.join()
+		# Drop views into shared memory, then release segments
+		for pm in self._mass_list:
+			pm._r = [float(x) for x in pm._r]
+		del self.mass_r_array, self.mass_m_array, self.mass_amp_array
+		for shm in self.shm_dict.values():
+			shm.close()
+			shm.unlink()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/kernel/np6.py: Kernel
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# KERNEL META
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+__longname__ = 'numpy-backend [parallel] (6)'
+__version__ = '0.0.1'
+__description__ = 'numpy backend, parallel, thread pool, tiled'
+__requirements__ = ['numpy']
+__externalrequirements__ = []
+__interpreters__ = ['python3']
+__parallel__ = True
+__license__ = 'GPLv2'
+__authors__ = [
+	'Sebastian M. Ernst <ernst@pleiszenburg.de>',
+	]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ..lib.partition import tile_assignments
+from ._base_ import universe_base
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+TILE_LEN = 128 # large enough for ufuncs to release the GIL for most of their runtime
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class universe(universe_base):
+
+	def start_kernel(self):
+		self.DTYPE = self._dtype
+		# Get const values
+		self.MASS_LEN = len(self)
+		self.SIM_DIM = len(self._mass_list[0]._r)
+		self.CPU_LEN = self._threads
+		self.TILE_LEN = int(self._meta.get('tile_len', TILE_LEN))
+		# Allocate memory: Object parameters, transposed views (SIM_DIM, MASS_LEN) are contiguous
+		self.mass_r_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F')
+		self.mass_v_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F')
+		self.mass_a_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F')
+		self.mass_m_array = np.zeros((self.MASS_LEN,), dtype = self.DTYPE)
+		self.mass_rt_array = self.mass_r_array.T
+		# Copy const data into Numpy infrastructure and link mass objects to Numpy views
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_m_array[pm_index] = pm._m
+		for pm_index, pm in enumerate(self._mass_list):
+			self.mass_r_array[pm_index,:] = pm._r[:]
+			pm._r = self.mass_r_array[pm_index,:]
+			self.mass_v_array[pm_index,:] = pm._v[:]
+			pm._v = self.mass_v_array[pm_index,:]
+			pm._a = self.mass_a_array[pm_index,:]
+		# Allocate memory: Per-thread accelerations
+		self.mass_amp_array = np.zeros((self.CPU_LEN, self.SIM_DIM, self.MASS_LEN), dtype = self.DTYPE)
+		# Allocate memory: Per-thread temporary variables, sized for one tile
+		tile_shape = (self.TILE_LEN, self.TILE_LEN)
+		self.scratch_pool = [{
+			'relative_r': np.zeros((self.SIM_DIM,) + tile_shape, dtype = self.DTYPE),
+			'relative_ra': np.zeros((self.SIM_DIM,) + tile_shape, dtype = self.DTYPE),
+			'distance_sq': np.zeros(tile_shape, dtype = self.DTYPE),
+			'distance': np.zeros(tile_shape, dtype = self.DTYPE),
+			'a_factor': np.zeros(tile_shape, dtype = self.DTYPE),
+			'a_factor_m': np.zeros(tile_shape, dtype = self.DTYPE),
+			'a_sum': np.zeros((self.SIM_DIM, self.TILE_LEN), dtype = self.DTYPE),
+			} for _ in range(self.CPU_LEN)]
+		# Pairs on and below the diagonal of diagonal tiles
+		self.diagonal_mask = np.tril(np.ones(tile_shape, dtype = np.bool_))
+		# Tiles per thread, balanced by number of pairs
+		self.tile_pool = tile_assignments(self.MASS_LEN, self.TILE_LEN, self.CPU_LEN)
+		# Init thread pool
+		self.cpu_pool = ThreadPoolExecutor(max_workers = self.CPU_LEN)
+		# Allocate memory: Temporary variables
+		self.mass_vt_array = np.zeros((self.MASS_LEN, self.SIM_DIM), dtype = self.DTYPE, order = 'F')
+
+	def update_tile(self, i_start, i_end, j_start, j_end, mass_a_array, scratch):
+		i_len, j_len = i_end - i_start, j_end - j_start
+		relative_r = scratch['relative_r'][:, :i_len, :j_len]
+		relative_ra = scratch['relative_ra'][:, :i_len, :j_len]
+		distance_sq = scratch['distance_sq'][:i_len, :j_len]
+		distance = scratch['distance'][:i_len, :j_len]
+		a_factor = scratch['a_factor'][:i_len, :j_len]
+		a_factor_m = scratch['a_factor_m'][:i_len, :j_len]
+		# r_j - r_i for all pairs of tile
+		np.subtract(
+			self.mass_rt_array[:, np.newaxis, j_start:j_end], self.mass_rt_array[:, i_start:i_end, np.newaxis],
+			out = relative_r,
+			)
+		np.multiply(relative_r, relative_r, out = relative_ra)
+		np.add.reduce(relative_ra, axis = 0, out = distance_sq)
+		if i_start == j_start: # diagonal tile: drop pairs (i, j) with j <= i, G / inf = 0
+			distance_sq[self.diagonal_mask[:i_len, :j_len]] = np.inf
+		# Normalize r_j - r_i (distance cubed overflows single precision)
+		np.sqrt(distance_sq, out = distance)
+		np.divide(relative_r, distance[np.newaxis, :, :], out = relative_r)
+		np.divide(self._G, distance_sq, out = a_factor)
+		# Accelerations of i
+		np.multiply(a_factor, self.mass_m_array[np.newaxis, j_start:j_end], out = a_factor_m)
+		np.multiply(relative_r, a_factor_m[np.newaxis, :, :], out = relative_ra)
+		np.add.reduce(relative_ra, axis = 2, out = scratch['a_sum'][:, :i_len])
+		np.add(mass_a_array[:, i_start:i_end], scratch['a_sum'][:, :i_len], out = mass_a_array[:, i_start:i_end])
+		# Accelerations of j
+		np.multiply(a_factor, self.mass_m_array[i_start:i_end, np.newaxis], out = a_factor_m)
+		np.multiply(relative_r, a_factor_m[np.newaxis, :, :], out = relative_ra)
+		np.add.reduce(relative_ra, axis = 1, out = scratch['a_sum'][:, :j_len])
+		np.subtract(mass_a_array[:, j_start:j_end], scratch['a_sum'][:, :j_len], out = mass_a_array[:, j_start:j_end])
+
+	def step_stage1_thread(self, thread_id):
+		mass_a_array = self.mass_amp_array[thread_id]
+		mass_a_array[:, :] = 0.0
+		for tile in self.tile_pool[thread_id]:
+			self.update_tile(*tile, mass_a_array, self.scratch_pool[thread_id])
+
+	def step_stage1(self):
+		futures = [
+			self.cpu_pool.submit(self.step_stage1_thread, thread_id)
+			for thread_id in range(self.CPU_LEN)
+			]
+		for future in futures:
+			future.result() # re-raises exceptions from threads
+		# Reduce per-thread accelerations
+		np.add.reduce(self.mass_amp_array, axis = 0, out = self.mass_a_array.T)
+
+	def step_stage2(self):
+		np.multiply(self.mass_a_array, self._T, out = self.mass_a_array)
+		np.add(self.mass_v_array, self.mass_a_array, out = self.mass_v_array)
+		np.multiply(self.mass_v_array, self._T, out = self.mass_vt_array)
+		np.add(self.mass_r_array, self.mass_vt_array, out = self.mass_r_array)
+
+	def stop_kernel(self):
+		self.cpu_pool.shutdown(wait = True)
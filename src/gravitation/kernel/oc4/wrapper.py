@@ -36,13 +36,19 @@ import numpy as np
 
 import oct2py
 
+from ...lib.affinity import pin_next_worker, worker_counter
+from ...lib.partition import row_ranges
+from ...lib.threads import configure as configure_threads
 from .._base_ import universe_base
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # ROUTINES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-def create_worker_context():
+def create_worker_context(counter):
+	# Pin worker process (and its octave session) to its own core if requested, one thread per process
+	pin_next_worker(counter)
+	configure_threads(1)
 	# Store context information in global namespace of worker
 	global context
 	context = {}
@@ -95,26 +101,11 @@ class universe(universe_base):
 		for pm_index, pm in enumerate(self._mass_list):
 			mass_m_array[pm_index] = pm._m
 
-		# Compute line index tuples for evenly sized batches
-		total_pairs = (self.MASS_LEN * (self.MASS_LEN - 1)) // 2
-		batch_length = total_pairs // self.CPU_LEN
-		self.index_pool = []
-		pair_count = 0
-		start_line = 0
-		for line in range(1, self.MASS_LEN - 1):
-			pair_count += (self.MASS_LEN - 1 - line)
-			if pair_count < batch_length:
-				continue
-			pair_count = 0
-			self.index_pool.append((start_line, line))
-			start_line = line
-		assert len(self.index_pool) in [(self.CPU_LEN - 1), self.CPU_LEN]
-		if len(self.index_pool) == self.CPU_LEN - 1:
-			self.index_pool.append((start_line, self.MASS_LEN - 1))
-		assert self.index_pool[-1][1] == self.MASS_LEN - 1
+		# Line index tuples for batches with balanced numbers of pairs
+		self.index_pool = row_ranges(self.MASS_LEN, self.CPU_LEN)
 
 		# Init multiprocessing pool
-		self.cpu_pool = mp.Pool(processes = self.CPU_LEN, initializer = create_worker_context)
+		self.cpu_pool = mp.Pool(processes = self.CPU_LEN, initializer = create_worker_context, initargs = (worker_counter(),))
 		pool_results = [
 			self.cpu_pool.apply_async(
 				init_worker_context,
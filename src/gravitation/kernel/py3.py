@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/kernel/py3.py: Kernel
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# KERNEL META
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+__longname__ = 'python-backend [parallel] (3)'
+__version__ = '0.0.1'
+__description__ = 'pure python backend, parallel, threads (scales on free-threaded CPython)'
+__requirements__ = []
+__externalrequirements__ = []
+__interpreters__ = ['python3', 'python3t', 'pypy3']
+__parallel__ = True
+__license__ = 'GPLv2'
+__authors__ = [
+	'Sebastian M. Ernst <ernst@pleiszenburg.de>',
+	]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import math
+import threading
+
+from ..lib.partition import row_ranges
+from ._base_ import universe_base
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class universe(universe_base):
+
+	def start_kernel(self):
+		# Get const values
+		self.MASS_LEN = len(self)
+		self.SIM_DIM = len(self._mass_list[0]._r)
+		self.CPU_LEN = self._threads
+		# Shared positions (updated by main thread) and masses
+		self.mass_r_list = [[0.0 for _ in range(self.MASS_LEN)] for _ in range(self.SIM_DIM)]
+		self.mass_m_list = [pm._m for pm in self._mass_list]
+		# Per-thread accelerations
+		self.mass_amp_list = [
+			[[0.0 for _ in range(self.MASS_LEN)] for _ in range(self.SIM_DIM)]
+			for _ in range(self.CPU_LEN)
+			]
+		# Start persistent threads, one row range each
+		self.start_barrier = threading.Barrier(self.CPU_LEN + 1)
+		self.done_barrier = threading.Barrier(self.CPU_LEN + 1)
+		self.stop_flag = False
+		self.error_list = []
+		self.cpu_pool = [
+			threading.Thread(
+				target = self.step_stage1_thread, args = (thread_id, i_start, i_end), daemon = True,
+				)
+			for thread_id, (i_start, i_end) in enumerate(row_ranges(self.MASS_LEN, self.CPU_LEN))
+			]
+		for thread in self.cpu_pool:
+			thread.start()
+
+	def update_rows(self, i_start, i_end, ax, ay, az):
+		rx, ry, rz = self.mass_r_list
+		m = self.mass_m_list
+		G = self._G
+		N = self.MASS_LEN
+		sqrt = math.sqrt
+		for i in range(i_start, i_end):
+			xi, yi, zi, mi = rx[i], ry[i], rz[i], m[i]
+			axi, ayi, azi = 0.0, 0.0, 0.0
+			for j in range(i + 1, N):
+				dx, dy, dz = xi - rx[j], yi - ry[j], zi - rz[j]
+				distance_sq = dx * dx + dy * dy + dz * dz
+				a_factor = G / (distance_sq * sqrt(distance_sq))
+				a1 = a_factor * m[j]
+				a2 = a_factor * mi
+				axi -= dx * a1
+				ayi -= dy * a1
+				azi -= dz * a1
+				ax[j] += dx * a2
+				ay[j] += dy * a2
+				az[j] += dz * a2
+			ax[i] += axi
+			ay[i] += ayi
+			az[i] += azi
+
+	def step_stage1_thread(self, thread_id, i_start, i_end):
+		ax, ay, az = self.mass_amp_list[thread_id]
+		try:
+			while True:
+				self.start_barrier.wait()
+				if self.stop_flag:
+					break
+				for a in (ax, ay, az):
+					a[:] = [0.0] * self.MASS_LEN
+				self.update_rows(i_start, i_end, ax, ay, az)
+				self.done_barrier.wait()
+		except threading.BrokenBarrierError:
+			pass
+		except Exception as e:
+			# Wake up main thread (BrokenBarrierError) and hand over exception
+			self.error_list.append(e)
+			self.start_barrier.abort()
+			self.done_barrier.abort()
+
+	def step_stage1(self):
+		# Copy positions into shared lists
+		for dim in range(self.SIM_DIM):
+			self.mass_r_list[dim][:] = [pm._r[dim] for pm in self._mass_list]
+		# Signal threads and wait for them
+		try:
+			self.start_barrier.wait()
+			self.done_barrier.wait()
+		except threading.BrokenBarrierError:
+			if len(self.error_list) > 0:
+				raise self.error_list[0]
+			raise
+		# Reduce per-thread accelerations
+		for dim in range(self.SIM_DIM):
+			a_dim = [sum(a) for a in zip(*[a_thread[dim] for a_thread in self.mass_amp_list])]
+			for pm, a in zip(self._mass_list, a_dim):
+				pm._a[dim] = a
+
+	def stop_kernel(self):
+		self.stop_flag = True
+		if not self.start_barrier.broken:
+			self.start_barrier.wait()
+		for thread in self.cpu_pool:
+			thread.join()
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/lib/affinity.py: CPU affinity, thread placement and NUMA topology
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import glob
+import multiprocessing as mp
+import os
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+NODE_DIR = '/sys/devices/system/node'
+
+# Inherited by pool processes, which pin themselves to one CPU each
+ENV_CPUS = 'GRAVITATION_CPUS'
+ENV_PIN = 'GRAVITATION_PIN'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def parse_cpus(spec):
+	"""parses CPU list like "0-3,8,10-11" (as used by taskset and sysfs), returns sorted list of ints"""
+	cpus = set()
+	for item in spec.split(','):
+		item = item.strip()
+		if item == '':
+			continue
+		if '-' in item:
+			start, end = (int(x) for x in item.split('-', 1))
+			if end < start:
+				raise ValueError('invalid CPU range "%s"' % item)
+			cpus.update(range(start, end + 1))
+		else:
+			cpus.add(int(item))
+	return sorted(cpus)
+
+def format_cpus(cpus):
+	"""inverse of parse_cpus, returns compact CPU list string"""
+	ranges = []
+	for cpu in sorted(cpus):
+		if len(ranges) > 0 and ranges[-1][1] == cpu - 1:
+			ranges[-1][1] = cpu
+		else:
+			ranges.append([cpu, cpu])
+	return ','.join(
+		'%d' % start if start == end else '%d-%d' % (start, end)
+		for start, end in ranges
+		)
+
+def get_available_cpus():
+	"""returns sorted list of CPUs the current process may run on"""
+	if hasattr(os, 'sched_getaffinity'):
+		return sorted(os.sched_getaffinity(0))
+	return list(range(os.cpu_count()))
+
+def get_numa_topology():
+	"""returns list of NUMA nodes (CPUs, memory, distances) from sysfs, empty if not available"""
+	nodes = []
+	for node_path in glob.glob(os.path.join(NODE_DIR, 'node[0-9]*')):
+		node = dict(node = int(os.path.basename(node_path)[4:]))
+		try:
+			with open(os.path.join(node_path, 'cpulist'), 'r') as f:
+				node['cpus'] = parse_cpus(f.read())
+			with open(os.path.join(node_path, 'distance'), 'r') as f:
+				node['distance'] = [int(x) for x in f.read().split()]
+		except (OSError, ValueError):
+			continue
+		try:
+			with open(os.path.join(node_path, 'meminfo'), 'r') as f:
+				for line in f:
+					if 'MemTotal:' in line:
+						node['memory'] = int(line.split()[-2]) * 1024 # kB to bytes
+		except (OSError, ValueError, IndexError):
+			pass
+		nodes.append(node)
+	nodes.sort(key = lambda node: node['node'])
+	return nodes
+
+def allocate_cpus(free, count, nodes = None):
+	"""
+	picks count CPUs out of free ones for one job, from a single NUMA node if possible (the fullest
+	one which fits, keeping emptier nodes for larger jobs), returns sorted list or None if too few
+	"""
+	free = sorted(free)
+	if count > len(free):
+		return None
+	nodes = get_numa_topology() if nodes is None else nodes
+	candidates = [
+		cpus for cpus in (sorted(set(node['cpus']) & set(free)) for node in nodes)
+		if len(cpus) >= count
+		]
+	if len(candidates) > 0:
+		return min(candidates, key = len)[:count]
+	return free[:count]
+
+def configure(cpus = None, pin = False):
+	"""
+	restricts current process to cpus (list, None for all available CPUs). If pin is set, OpenMP
+	threads are bound to one CPU each and pool processes pin themselves (see pin_worker). MUST be
+	called before kernel modules are loaded, i.e. before any OpenMP runtime reads its environment.
+	"""
+	available = get_available_cpus()
+	cpus = available if cpus is None or len(cpus) == 0 else sorted(cpus)
+	unavailable = sorted(set(cpus) - set(available))
+	if len(unavailable) > 0:
+		raise ValueError('CPUs %s are not available, choose from %s' % (
+			format_cpus(unavailable), format_cpus(available),
+			))
+	if cpus != available:
+		if not hasattr(os, 'sched_setaffinity'):
+			raise OSError('setting CPU affinity is not supported on this platform')
+		os.sched_setaffinity(0, cpus)
+	os.environ[ENV_CPUS] = format_cpus(cpus)
+	if pin:
+		os.environ[ENV_PIN] = '1'
+		os.environ['OMP_PLACES'] = ','.join('{%d}' % cpu for cpu in cpus)
+		os.environ['OMP_PROC_BIND'] = 'close'
+	else:
+		os.environ.pop(ENV_PIN, None)
+
+def get_config():
+	"""returns currently configured CPUs and pinning"""
+	cpus = os.environ.get(ENV_CPUS, None)
+	return dict(
+		cpus = parse_cpus(cpus) if cpus is not None else get_available_cpus(),
+		pin = os.environ.get(ENV_PIN, '') == '1',
+		)
+
+def pin_worker(worker_id):
+	"""pins calling process to configured CPU worker_id (modulo number of CPUs) if pinning is enabled"""
+	if os.environ.get(ENV_PIN, '') != '1' or not hasattr(os, 'sched_setaffinity'):
+		return
+	cpus = parse_cpus(os.environ[ENV_CPUS])
+	os.sched_setaffinity(0, [cpus[worker_id % len(cpus)]])
+
+def worker_counter():
+	"""returns shared counter for numbering pool processes, pass it to pin_next_worker"""
+	return mp.Value('i', 0)
+
+def pin_next_worker(counter):
+	"""pins calling pool process (e.g. from a pool initializer) to the next configured CPU"""
+	with counter.get_lock():
+		worker_id = counter.value
+		counter.value += 1
+	pin_worker(worker_id)
+
+def pin_next_worker_in(path):
+	"""pins calling pool process to the next configured CPU, numbered by claiming a file in directory
+	path, for pools which can not inherit a worker_counter (e.g. joblib's loky)"""
+	worker_id = 0
+	while True:
+		try:
+			os.close(os.open(os.path.join(path, 'worker-%d' % worker_id), os.O_CREAT | os.O_EXCL))
+			break
+		except FileExistsError:
+			worker_id += 1
+	pin_worker(worker_id)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/lib/autotune.py: Thread count tuning per kernel and size, cached per machine
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import hashlib
+import json
+import os
+import platform
+import sys
+import tempfile
+
+from .affinity import get_available_cpus
+from .build import get_cpu_model
+from .load import inventory
+from .timing import best_run_timer
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+CACHE_DIR = os.path.join(
+	os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+	'gravitation', 'autotune',
+	)
+
+PROBE_STEPS = 3 # timed steps per probe, after one untimed warm-up step
+TOLERANCE = 0.05 # fewer threads win unless more threads are faster by more than this
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def get_fingerprint():
+	"""returns description of machine and interpreter, i.e. everything tuning results depend on"""
+	return dict(
+		cpu = get_cpu_model(),
+		cpus = len(get_available_cpus()),
+		machine = platform.machine(),
+		system = platform.system(),
+		implementation = platform.python_implementation(),
+		version = list(sys.version_info[:2]),
+		gil = getattr(sys, '_is_gil_enabled', lambda: True)(),
+		)
+
+def get_cache_fn():
+	"""returns name of cache file for current machine"""
+	h = hashlib.sha256(json.dumps(get_fingerprint(), sort_keys = True).encode('utf-8'))
+	return os.path.join(CACHE_DIR, '{hash:s}.json'.format(hash = h.hexdigest()[:16]))
+
+def _get_key(kernel, scenario, stars_len):
+	return '{kernel:s}:{scenario:s}:{stars_len}'.format(
+		kernel = kernel, scenario = scenario, stars_len = stars_len,
+		)
+
+def _load_cache():
+	try:
+		with open(get_cache_fn(), 'r') as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return dict(fingerprint = get_fingerprint(), results = {})
+
+def _store_cache(cache):
+	os.makedirs(CACHE_DIR, exist_ok = True)
+	fd, tmp_fn = tempfile.mkstemp(suffix = '.json', dir = CACHE_DIR) # atomic replace, parallel workers
+	with os.fdopen(fd, 'w') as f:
+		json.dump(cache, f, indent = '\t', sort_keys = True)
+	os.replace(tmp_fn, get_cache_fn())
+
+def get_candidates(max_threads = None):
+	"""returns thread counts worth probing: powers of two up to and including max_threads"""
+	max_threads = len(get_available_cpus()) if max_threads is None else max_threads
+	candidates = []
+	threads = 1
+	while threads < max_threads:
+		candidates.append(threads)
+		threads *= 2
+	candidates.append(max_threads)
+	return candidates
+
+def get_kernel_name(universe_class):
+	"""returns name of kernel a universe class belongs to"""
+	return universe_class.__module__.split('.')[2] # gravitation.kernel.{name}[.wrapper]
+
+def probe(universe_class, threads, scenario = 'galaxy', scenario_param = None, steps = PROBE_STEPS):
+	"""returns best step runtime [ns] of a short simulation run"""
+	from .simulation import create_simulation # circular import
+	s = create_simulation(
+		scenario = scenario,
+		universe_class = universe_class,
+		scenario_param = scenario_param,
+		threads = threads,
+		)
+	try:
+		s.step() # warm-up, e.g. JIT compilation and first touch of memory
+		rt = best_run_timer()
+		for _ in range(steps):
+			rt.start()
+			s.step()
+			rt.stop()
+	finally:
+		s.stop()
+	return rt.min()
+
+def autotune(
+	kernel, scenario = 'galaxy', scenario_param = None, candidates = None, steps = PROBE_STEPS,
+	):
+	"""probes thread counts for kernel and size, caches and returns result dict"""
+	scenario_param = {} if scenario_param is None else scenario_param
+	inventory[kernel].load_meta()
+	parallel = inventory[kernel]['parallel']
+	parallel = parallel if isinstance(parallel, bool) else False
+	if inventory[kernel]['mpi'] is True: # one rank per thread, launched by mpirun: in-process only one
+		parallel = False
+	candidates = (get_candidates() if candidates is None else sorted(candidates)) if parallel else [1]
+	inventory[kernel].load_module()
+	universe_class = inventory[kernel].get_class()
+
+	runtimes = {
+		threads: probe(universe_class, threads, scenario, scenario_param, steps)
+		for threads in candidates
+		}
+	best_runtime = min(runtimes.values())
+	result = dict(
+		threads = min(
+			threads for threads, runtime in runtimes.items()
+			if runtime <= best_runtime * (1.0 + TOLERANCE)
+			),
+		runtimes = {str(threads): runtime for threads, runtime in runtimes.items()},
+		)
+
+	cache = _load_cache()
+	cache['results'][_get_key(kernel, scenario, scenario_param.get('stars_len', None))] = result
+	_store_cache(cache)
+	return result
+
+def get_tuned_threads(kernel, scenario = 'galaxy', scenario_param = None, tune_missing = True):
+	"""returns cached best thread count for kernel and size, tunes if not cached (or returns None)"""
+	scenario_param = {} if scenario_param is None else scenario_param
+	result = _load_cache()['results'].get(
+		_get_key(kernel, scenario, scenario_param.get('stars_len', None)), None
+		)
+	if result is None:
+		if not tune_missing:
+			return None
+		result = autotune(kernel, scenario, scenario_param)
+	return result['threads']
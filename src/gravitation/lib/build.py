@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/lib/build.py: On-demand builds of C kernel libraries
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import ctypes
+import hashlib
+import os
+import platform
+import shlex
+import subprocess
+import tempfile
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+KERNEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'kernel')
+CACHE_DIR = os.path.join(
+	os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+	'gravitation', 'build',
+	)
+
+CFLAGS_DEFAULT = '-O3 -ffast-math -march=native -mtune=native -mfpmath=sse'
+CFLAGS_REQUIRED = ['-std=gnu11', '-fPIC', '-shared', '-Wall']
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_config = {'cc': None, 'cflags': None}
+
+def configure(cc = None, cflags = None):
+	"""selects compiler and flags for libraries loaded afterwards, None means pre-built by setup.py"""
+	_config['cc'] = cc if cc else None
+	_config['cflags'] = cflags if cflags else None
+
+def get_config():
+	"""returns currently selected compiler and flags"""
+	return dict(
+		cc = _config['cc'],
+		cflags = (CFLAGS_DEFAULT if _config['cflags'] is None else _config['cflags'])
+			if _config['cc'] is not None else None,
+		)
+
+def get_cpu_model():
+	"""returns CPU model name, falls back to platform information"""
+	try:
+		with open('/proc/cpuinfo', 'r') as f:
+			for line in f:
+				if line.startswith('model name'):
+					return line.split(':', 1)[1].strip()
+	except OSError:
+		pass
+	return '{machine:s} {processor:s}'.format(
+		machine = platform.machine(), processor = platform.processor(),
+		)
+
+def get_compiler_version(cc):
+	"""returns first line of compiler's version string"""
+	try:
+		out = subprocess.run(
+			[cc, '--version'], stdout = subprocess.PIPE, stderr = subprocess.PIPE, check = True,
+			).stdout.decode('utf-8')
+	except (OSError, subprocess.CalledProcessError) as e:
+		raise OSError('compiler "%s" is not available: %s' % (cc, str(e)))
+	return out.split('\n', 1)[0].strip()
+
+def build_library(name, cc, cflags = None):
+	"""compiles kernel library if not yet cached, returns path to shared object"""
+	cflags = CFLAGS_DEFAULT if cflags is None else cflags
+	src_fn = os.path.join(KERNEL_DIR, name, 'lib.c')
+	with open(src_fn, 'rb') as f:
+		src = f.read()
+	cmd_flags = CFLAGS_REQUIRED + (['-fopenmp'] if b'#pragma omp' in src else []) + shlex.split(cflags)
+	h = hashlib.sha256(src)
+	for item in (get_compiler_version(cc), cc, ' '.join(cmd_flags), get_cpu_model()):
+		h.update(b'\0' + item.encode('utf-8'))
+	lib_fn = os.path.join(CACHE_DIR, '{name:s}-{hash:s}.so'.format(
+		name = name.strip('_'), hash = h.hexdigest()[:16],
+		))
+	if os.path.exists(lib_fn):
+		return lib_fn
+	os.makedirs(CACHE_DIR, exist_ok = True)
+	fd, tmp_fn = tempfile.mkstemp(suffix = '.so', dir = CACHE_DIR) # atomic replace, parallel workers
+	os.close(fd)
+	proc = subprocess.run(
+		[cc, *cmd_flags, '-o', tmp_fn, src_fn, '-lm'],
+		stdout = subprocess.PIPE, stderr = subprocess.PIPE,
+		)
+	if proc.returncode != 0:
+		os.unlink(tmp_fn)
+		raise OSError('building %s with %s failed:\n%s' % (name, cc, proc.stderr.decode('utf-8')))
+	os.replace(tmp_fn, lib_fn)
+	return lib_fn
+
+def load_library(name):
+	"""loads kernel library, pre-built or built on demand for configured compiler and flags"""
+	if _config['cc'] is None:
+		return ctypes.cdll.LoadLibrary(os.path.join(KERNEL_DIR, name, 'lib.so'))
+	return ctypes.cdll.LoadLibrary(build_library(name, _config['cc'], _config['cflags']))
@@ -90,8 +90,10 @@ class _kernel:
 				'description',
 				'requirements',
 				'externalrequirements',
+				'libraries',
 				'interpreters',
 				'parallel',
+				'mpi',
 				'license',
 				'authors',
 				)],
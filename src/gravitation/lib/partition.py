@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/lib/partition.py: Work partitioning for triangular pair workloads
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import bisect
+import heapq
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def pair_cost(pairs, rows):
+	"""default cost model: number of pairs, row overhead is ignored"""
+	return pairs
+
+def pairs_len(i_start, i_end, j_start, j_end):
+	"""number of unique pairs (i, j) with i < j in rows [i_start, i_end) and columns [j_start, j_end)"""
+	total = 0
+	# rows entirely left of the columns: all columns are paired
+	full = min(i_end, j_start) - i_start
+	if full > 0 and j_end > j_start:
+		total += full * (j_end - j_start)
+	# rows crossing the diagonal: columns i + 1 ... j_end - 1
+	a, b = max(i_start, j_start), min(i_end, j_end - 1)
+	if b > a:
+		total += (b - a) * (j_end - 1) - ((a + b - 1) * (b - a)) // 2
+	return total
+
+def row_ranges(length, parts, cost = None, block = 1):
+	"""
+	splits rows [0, length) of a triangular pair workload into parts contiguous (start, end) ranges
+	of balanced cost. Row i is paired with rows i + 1 ... length - 1. Always returns parts ranges,
+	some of which may be empty if there are fewer rows than parts. Range boundaries are multiples of
+	block (except for length). cost(pairs, rows) maps the size of a block of rows to its cost.
+	"""
+	if parts < 1:
+		raise ValueError('at least one part required')
+	if block < 1:
+		raise ValueError('block length must be at least one')
+	if length < 0:
+		raise ValueError('length must not be negative')
+	cost = pair_cost if cost is None else cost
+
+	# Cumulative cost at block boundaries
+	starts = list(range(0, length, block))
+	cumulative = [0]
+	for start in starts:
+		end = min(start + block, length)
+		cumulative.append(cumulative[-1] + cost(pairs_len(start, end, 0, length), end - start))
+	total = cumulative[-1]
+
+	# Boundary closest to each ideal split point, never moving backwards
+	boundaries = [0]
+	for part in range(1, parts):
+		target = total * part / parts
+		index = bisect.bisect_left(cumulative, target, lo = boundaries[-1])
+		if index > boundaries[-1] and (
+			index == len(cumulative) or
+			target - cumulative[index - 1] <= cumulative[index] - target
+			):
+			index -= 1
+		boundaries.append(min(index, len(starts)))
+	boundaries.append(len(starts))
+
+	return [
+		(min(a * block, length), min(b * block, length))
+		for a, b in zip(boundaries[:-1], boundaries[1:])
+		]
+
+def tiles(length, tile_len, cost = None):
+	"""
+	splits the upper triangle (including the diagonal) of the length x length pair matrix into
+	square tiles of edge tile_len, returns (i_start, i_end, j_start, j_end) tuples ordered from most
+	to least expensive (i.e. suitable for dynamic scheduling), tiles without pairs are skipped
+	"""
+	if tile_len < 1:
+		raise ValueError('tile length must be at least one')
+	cost = pair_cost if cost is None else cost
+	tile_list = []
+	for i_start in range(0, length, tile_len):
+		i_end = min(i_start + tile_len, length)
+		for j_start in range(i_start, length, tile_len):
+			j_end = min(j_start + tile_len, length)
+			tile_pairs = pairs_len(i_start, i_end, j_start, j_end)
+			if tile_pairs == 0:
+				continue
+			tile_list.append((cost(tile_pairs, i_end - i_start), (i_start, i_end, j_start, j_end)))
+	tile_list.sort(key = lambda item: item[0], reverse = True) # stable, keeps row order among equals
+	return [tile for _, tile in tile_list]
+
+def tile_assignments(length, tile_len, parts, cost = None):
+	"""
+	statically assigns tiles (see tiles) to parts, balancing cost by greedily handing the most
+	expensive remaining tile to the least loaded part, returns one list of tiles per part
+	"""
+	if parts < 1:
+		raise ValueError('at least one part required')
+	cost = pair_cost if cost is None else cost
+	assignments = [[] for _ in range(parts)]
+	loads = [(0, part) for part in range(parts)]
+	for tile in tiles(length, tile_len, cost = cost):
+		load, part = heapq.heappop(loads)
+		assignments[part].append(tile)
+		i_start, i_end, j_start, j_end = tile
+		heapq.heappush(loads, (load + cost(pairs_len(*tile), i_end - i_start), part))
+	return assignments
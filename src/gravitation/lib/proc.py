@@ -28,11 +28,10 @@ specific language governing rights and limitations under the License.
 # IMPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import collections
 import os
-import queue
+import selectors
 import subprocess
-import threading
-import time
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CONST
@@ -41,64 +40,111 @@ import time
 STDOUT = 1
 STDERR = 2
 
+CHUNK_LEN = 65536 # bytes read at once from a pipe
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # ROUTINES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-def _read_stream_worker(in_stream, out_queue):
-	"""reads lines from stream and puts them into queue"""
-	for line in iter(in_stream.readline, b''):
-		out_queue.put(line)
-	in_stream.close()
-
-def _start_reader(in_stream):
-	"""starts reader thread and returns a thread object and a queue object"""
-	out_queue = queue.Queue()
-	reader_thread = threading.Thread(
-		target = _read_stream_worker, args = (in_stream, out_queue)
-		)
-	reader_thread.daemon = True
-	reader_thread.start()
-	return reader_thread, out_queue
-
-def _read_stream(stream_id, in_queue, out_list, processing):
-	"""reads lines from queue and processes them"""
-	try:
-		line = in_queue.get_nowait()
-	except queue.Empty:
-		pass
-	else:
-		line = line.decode('utf-8')
-		out_list.append(line)
-		processing(stream_id, line.strip('\n'))
-		in_queue.task_done()
-
-def run_command(cmd_list, unbuffer = False, processing = None):
-	"""subprocess.Popen wrapper, reads stdout and stderr in realtime"""
+def _set_unbuffer(unbuffer):
+	"""makes Python child processes (not) buffer their output"""
 	if unbuffer:
 		os.environ['PYTHONUNBUFFERED'] = '1'
 	else:
 		os.environ['PYTHONUNBUFFERED'] = '0'
+
+def run_command(cmd_list, unbuffer = False, processing = None):
+	"""subprocess.Popen wrapper, reads stdout and stderr in realtime"""
+	_set_unbuffer(unbuffer)
 	if processing is None:
 		processing = print
 	proc = subprocess.Popen(cmd_list, stdout = subprocess.PIPE, stderr = subprocess.PIPE)
-	stdout_thread, stdout_queue = _start_reader(proc.stdout)
-	stderr_thread, stderr_queue = _start_reader(proc.stderr)
-	stdout_list, stderr_list = [], []
-	proc_alive = True
-	while proc_alive:
-		time.sleep(0.2)
-		while not stdout_queue.empty():
-			_read_stream(STDOUT, stdout_queue, stdout_list, processing)
-		while not stderr_queue.empty():
-			_read_stream(STDERR, stderr_queue, stderr_list, processing)
-		proc_alive = proc.poll() is None
-	stdout_queue.join()
-	stderr_queue.join()
-	stdout_thread.join()
-	stderr_thread.join()
+	reader = _line_reader(proc)
+	out_lists = {STDOUT: [], STDERR: []}
+	item = reader.get()
+	while item is not None:
+		stream_id, line = item
+		out_lists[stream_id].append(line + '\n')
+		processing(stream_id, line)
+		item = reader.get()
+	proc.wait()
 	return (
 		not bool(proc.returncode),
-		''.join(stdout_list),
-		''.join(stderr_list)
+		''.join(out_lists[STDOUT]),
+		''.join(out_lists[STDERR])
 		)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASSES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class _line_reader:
+	"""reads lines from stdout and stderr of a process as soon as they arrive"""
+
+	def __init__(self, proc):
+		self._selector = selectors.DefaultSelector()
+		self._buffers = {}
+		for stream_id, stream in ((STDOUT, proc.stdout), (STDERR, proc.stderr)):
+			self._selector.register(stream, selectors.EVENT_READ, stream_id)
+			self._buffers[stream_id] = b''
+		self._lines = collections.deque()
+
+	def get(self):
+		"""returns next (stream_id, line) without line break, blocking, or None once both streams are closed"""
+		while len(self._lines) == 0:
+			if len(self._selector.get_map()) == 0:
+				self._selector.close()
+				return None
+			for key, _ in self._selector.select():
+				chunk = os.read(key.fd, CHUNK_LEN) # does not block, data or end of stream is pending
+				if len(chunk) == 0: # end of stream, i.e. process ended or closed it
+					self._selector.unregister(key.fileobj)
+					key.fileobj.close()
+					if len(self._buffers[key.data]) > 0: # last line without line break
+						self._lines.append((key.data, self._buffers[key.data]))
+					continue
+				lines = (self._buffers[key.data] + chunk).split(b'\n')
+				self._buffers[key.data] = lines.pop() # incomplete line
+				self._lines.extend((key.data, line) for line in lines)
+		stream_id, line = self._lines.popleft()
+		return stream_id, line.decode('utf-8')
+
+class server:
+	"""persistent subprocess, runs jobs sent line by line to stdin, reads stdout and stderr in realtime"""
+
+	def __init__(self, cmd_list, unbuffer = False):
+		_set_unbuffer(unbuffer)
+		self._proc = subprocess.Popen(
+			cmd_list, stdin = subprocess.PIPE, stdout = subprocess.PIPE, stderr = subprocess.PIPE,
+			)
+		self._reader = _line_reader(self._proc)
+
+	def run(self, job_line, processing, done):
+		"""sends one job, passes lines to processing until done(line) is True for a line from stdout,
+		returns False if the process ended before"""
+		try:
+			self._proc.stdin.write((job_line.strip('\n') + '\n').encode('utf-8'))
+			self._proc.stdin.flush()
+		except BrokenPipeError:
+			return False
+		item = self._reader.get()
+		while item is not None:
+			processing(*item)
+			if item[0] == STDOUT and done(item[1]):
+				return True
+			item = self._reader.get()
+		return False
+
+	def close(self, processing = None):
+		"""ends process by closing its stdin, passes remaining lines to processing, returns success"""
+		try:
+			self._proc.stdin.close()
+		except BrokenPipeError:
+			pass
+		item = self._reader.get()
+		while item is not None:
+			if processing is not None:
+				processing(*item)
+			item = self._reader.get()
+		self._proc.wait()
+		return not bool(self._proc.returncode)
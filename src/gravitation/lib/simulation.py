@@ -34,15 +34,21 @@ import random
 import numpy as np
 import h5py
 
+from .autotune import get_kernel_name, get_tuned_threads
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # ROUTINES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-def create_simulation(scenario, universe_class, scenario_param = None, threads = 1):
-	"""creates simulation based in scenario name and kernel class"""
+def create_simulation(scenario, universe_class, scenario_param = None, threads = None, start = True):
+	"""creates simulation based in scenario name and kernel class,
+	threads = 'auto' picks (cached) best thread count for kernel and size,
+	start = False leaves starting the simulation to the caller"""
 
-	universe_param = {'threads': threads}
 	scenario_param = scenario_param if scenario_param is not None else {}
+	if threads == 'auto':
+		threads = get_tuned_threads(get_kernel_name(universe_class), scenario, scenario_param)
+	universe_param = {'threads': threads}
 
 	if scenario == 'solarsystem':
 		universe_param.update(scenario_param)
@@ -78,7 +84,8 @@ def create_simulation(scenario, universe_class, scenario_param = None, threads =
 	else:
 		raise ValueError('Unknown scenario: "%s"' % scenario)
 
-	universe_obj.start()
+	if start:
+		universe_obj.start()
 
 	return universe_obj
 
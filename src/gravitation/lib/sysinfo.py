@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/lib/sysinfo.py: Platform, CPU and GPU information, cached per boot
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import hashlib
+import json
+import os
+import platform
+import tempfile
+
+import psutil
+
+try:
+	import cpuinfo
+	CPUINFO = True
+except:
+	CPUINFO = False
+
+try:
+	import GPUtil
+	GPUINFO = True
+except:
+	GPUINFO = False
+
+from .affinity import get_numa_topology
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+CACHE_DIR = os.path.join(
+	os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+	'gravitation', 'sysinfo',
+	)
+
+BOOT_ID_FN = '/proc/sys/kernel/random/boot_id' # Linux, changes with every boot
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def get_boot_id():
+	"""returns boot ID, None if not available"""
+	try:
+		with open(BOOT_ID_FN, 'r') as f:
+			return f.read().strip() or None
+	except OSError:
+		return None
+
+def _collect():
+	"""gathers platform information, slow: cpuinfo runs a subprocess, GPUtil runs nvidia-smi"""
+	return dict(
+		system = platform.system(),
+		release = platform.release(),
+		version = platform.version(),
+		machine = platform.machine(),
+		processor = platform.processor(),
+		cores = psutil.cpu_count(logical = False),
+		threads = psutil.cpu_count(logical = True),
+		numa = get_numa_topology(),
+		_cpu = cpuinfo.get_cpu_info() if CPUINFO else {},
+		_gpu = [
+			{
+				n: getattr(gpu, n)
+				for n in dir(gpu)
+				if not n.startswith('_') and n not in ('serial', 'uuid')
+				} for gpu in GPUtil.getGPUs()
+			] if GPUINFO else {},
+		)
+
+def _store_cache(fn, info):
+	os.makedirs(CACHE_DIR, exist_ok = True)
+	fd, tmp_fn = tempfile.mkstemp(suffix = '.json', dir = CACHE_DIR) # atomic replace, parallel workers
+	with os.fdopen(fd, 'w') as f:
+		json.dump(info, f, indent = '\t', sort_keys = True)
+	os.replace(tmp_fn, fn)
+
+def get_sysinfo():
+	"""returns platform information, cached per boot if the boot ID is available,
+	"ref" identifies it in logs (boot ID or hash of information)"""
+	boot_id = get_boot_id()
+	cache_fn = os.path.join(CACHE_DIR, '{boot_id:s}.json'.format(boot_id = boot_id)) if boot_id else None
+	if cache_fn is not None:
+		try:
+			with open(cache_fn, 'r') as f:
+				return json.load(f)
+		except (OSError, ValueError):
+			pass
+	info = _collect()
+	info['boot_id'] = boot_id
+	info['ref'] = boot_id if boot_id else hashlib.sha256(
+		json.dumps(info, sort_keys = True).encode('utf-8')
+		).hexdigest()[:16]
+	if cache_fn is not None:
+		_store_cache(cache_fn, info)
+	return info
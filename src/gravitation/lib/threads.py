@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	src/gravitation/lib/threads.py: Thread counts of OpenMP, BLAS, numexpr, numba and torch
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import os
+import sys
+
+try:
+	import threadpoolctl
+	THREADPOOLCTL = True
+except:
+	THREADPOOLCTL = False
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+ENV_THREADS = 'GRAVITATION_THREADS'
+
+# Read by the runtimes once, when they are loaded
+ENV_RUNTIMES = [
+	'OMP_NUM_THREADS',
+	'OPENBLAS_NUM_THREADS',
+	'MKL_NUM_THREADS',
+	'BLIS_NUM_THREADS',
+	'VECLIB_MAXIMUM_THREADS',
+	'NUMEXPR_NUM_THREADS',
+	'NUMEXPR_MAX_THREADS',
+	'NUMBA_NUM_THREADS',
+	]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def configure(threads):
+	"""
+	sets thread count of all runtimes for current process and its children. MUST be called before
+	kernel modules are loaded, as most runtimes read their environment only once. Runtimes which
+	are already loaded are limited right away.
+	"""
+	if threads < 1:
+		raise ValueError('at least one thread required')
+	os.environ[ENV_THREADS] = str(threads)
+	for name in ENV_RUNTIMES:
+		os.environ[name] = str(threads)
+	limit(threads)
+
+def get_threads():
+	"""returns configured thread count, one if not configured"""
+	return int(os.environ.get(ENV_THREADS, '1'))
+
+def limit(threads):
+	"""limits thread pools of loaded runtimes, does not load anything on its own"""
+	if 'numexpr' in sys.modules:
+		sys.modules['numexpr'].set_num_threads(threads)
+	if 'numba' in sys.modules:
+		numba = sys.modules['numba']
+		numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+	if 'torch' in sys.modules:
+		sys.modules['torch'].set_num_threads(threads)
+	if THREADPOOLCTL:
+		threadpoolctl.threadpool_limits(limits = threads) # BLAS and OpenMP libraries
+	else:
+		os.environ['OMP_NUM_THREADS'] = str(threads) # at least affects OpenMP runtimes loaded later
+
+def get_runtime_threads():
+	"""returns thread counts as reported by loaded runtimes"""
+	runtimes = {}
+	if 'numexpr' in sys.modules:
+		numexpr = sys.modules['numexpr']
+		if hasattr(numexpr, 'get_num_threads'):
+			runtimes['numexpr'] = numexpr.get_num_threads()
+	if 'numba' in sys.modules:
+		runtimes['numba'] = sys.modules['numba'].get_num_threads()
+	if 'torch' in sys.modules:
+		runtimes['torch'] = sys.modules['torch'].get_num_threads()
+	if THREADPOOLCTL:
+		for info in threadpoolctl.threadpool_info():
+			runtimes['{user_api:s}:{internal_api:s}'.format(**info)] = info['num_threads']
+	else:
+		runtimes['env:OMP_NUM_THREADS'] = int(os.environ.get('OMP_NUM_THREADS', '0'))
+	return runtimes
+
+def verify(threads):
+	"""returns runtimes (and their thread counts) which do not match threads"""
+	return {
+		name: runtime_threads
+		for name, runtime_threads in get_runtime_threads().items()
+		if runtime_threads != threads
+		}
@@ -28,6 +28,8 @@ specific language governing rights and limitations under the License.
 # IMPORT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import math
+
 try:
 	from time import time_ns
 except ImportError: # CPython <= 3.6
@@ -55,6 +57,22 @@ class best_run_timer:
 		if len(self._state) == 0:
 			raise SyntaxError('Nothing has been recorded.')
 		return min(self._state)
+	def median(self):
+		"""returns median of all recorded runtimes / states [ns as int]"""
+		if len(self._state) == 0:
+			raise SyntaxError('Nothing has been recorded.')
+		state = sorted(self._state)
+		return state[(len(state) - 1) // 2]
+	def median_ci(self, z = 1.96):
+		"""returns distribution-free confidence interval (lower, upper) of median [ns as int],
+		from order statistics, default 95%, None if too few runtimes / states were recorded"""
+		n = len(self._state)
+		offset = z * math.sqrt(n) / 2
+		lower, upper = math.floor(n / 2 - offset), math.ceil(n / 2 + 1 + offset) # ranks, 1-based
+		if lower < 1 or upper > n:
+			return None
+		state = sorted(self._state)
+		return state[lower - 1], state[upper - 1]
 	def sum(self):
 		"""returns sum of all recorded runtimes / states [ns as int]"""
 		if len(self._state) == 0:
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+GRAVITATION
+n-body-simulation performance test suite
+https://github.com/pleiszenburg/gravitation
+
+	tests/test_partition.py: Tests for partitioning of pair workloads
+
+	Copyright (C) 2019 Sebastian M. Ernst <ernst@pleiszenburg.de>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/pleiszenburg/gravitation/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import collections
+import functools
+
+import pytest
+
+from gravitation.lib.partition import pair_cost, pairs_len, row_ranges, tile_assignments, tiles
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+LENGTHS = [0, 1, 2, 3, 7, 64, 100, 1000, 2003]
+PARTS = [1, 2, 3, 4, 7, 16]
+BLOCKS = [1, 4, 8]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _pairs_brute(i_start, i_end, j_start, j_end):
+	return sum(
+		1
+		for i in range(i_start, i_end)
+		for j in range(j_start, j_end)
+		if i < j
+		)
+
+@functools.lru_cache()
+def _row_pairs_brute(length):
+	"""number of pairs per row, counted"""
+	return tuple(sum(1 for j in range(length) if i < j) for i in range(length))
+
+def _row_cost_brute(length, start, end, block, cost):
+	"""cost of rows [start, end) as sum over blocks, same as row_ranges accounts for it"""
+	row_pairs = _row_pairs_brute(length)
+	return sum(
+		cost(sum(row_pairs[a:min(a + block, end)]), min(a + block, end) - a)
+		for a in range(start, end, block)
+		)
+
+def _row_overhead_cost(pairs, rows):
+	return pairs + 50 * rows
+
+@pytest.mark.parametrize('length', [0, 1, 2, 3, 10, 17])
+def test_pairs_len(length):
+	for i_start in range(length + 1):
+		for i_end in range(i_start, length + 1):
+			for j_start in range(length + 1):
+				for j_end in range(j_start, length + 1):
+					assert pairs_len(i_start, i_end, j_start, j_end) == _pairs_brute(i_start, i_end, j_start, j_end)
+
+@pytest.mark.parametrize('cost', [None, _row_overhead_cost])
+@pytest.mark.parametrize('block', BLOCKS)
+@pytest.mark.parametrize('parts', PARTS)
+@pytest.mark.parametrize('length', LENGTHS)
+def test_row_ranges(length, parts, block, cost):
+	ranges = row_ranges(length, parts, cost = cost, block = block)
+	cost = pair_cost if cost is None else cost
+
+	# Exactly parts ranges, contiguous and disjoint, covering all rows
+	assert len(ranges) == parts
+	assert ranges[0][0] == 0
+	assert ranges[-1][1] == length
+	for (_, end), (start, _) in zip(ranges[:-1], ranges[1:]):
+		assert end == start
+	for start, end in ranges:
+		assert 0 <= start <= end <= length
+		assert start % block == 0 or start == length
+	assert sum(end - start for start, end in ranges) == length
+
+	# Balanced: every part within one block of the ideal share
+	block_costs = [
+		_row_cost_brute(length, start, min(start + block, length), block, cost)
+		for start in range(0, length, block)
+		]
+	total = sum(block_costs)
+	largest = max(block_costs, default = 0)
+	for start, end in ranges:
+		assert abs(_row_cost_brute(length, start, end, block, cost) - total / parts) <= largest
+
+def test_row_ranges_more_parts_than_rows():
+	ranges = row_ranges(3, 8)
+	assert len(ranges) == 8
+	assert sum(end - start for start, end in ranges) == 3
+	assert sum(_pairs_brute(start, end, 0, 3) for start, end in ranges) == 3
+
+def test_row_ranges_invalid():
+	with pytest.raises(ValueError):
+		row_ranges(10, 0)
+	with pytest.raises(ValueError):
+		row_ranges(10, 2, block = 0)
+	with pytest.raises(ValueError):
+		row_ranges(-1, 2)
+
+@pytest.mark.parametrize('length, tile_len', [
+	(length, tile_len) for length in LENGTHS[:-2] for tile_len in (1, 3, 8, 64)
+	] + [(1000, 8), (1000, 64)])
+def test_tiles(length, tile_len):
+	tile_list = tiles(length, tile_len)
+
+	# Every pair (i < j) is covered by exactly one tile, tiles stay in the upper triangle
+	covered = collections.Counter()
+	for i_start, i_end, j_start, j_end in tile_list:
+		assert 0 <= i_start < i_end <= length
+		assert 0 <= j_start < j_end <= length
+		assert i_end - i_start <= tile_len and j_end - j_start <= tile_len
+		assert i_start <= j_start
+		pairs = [(i, j) for i in range(i_start, i_end) for j in range(j_start, j_end) if i < j]
+		assert len(pairs) == pairs_len(i_start, i_end, j_start, j_end) > 0
+		covered.update(pairs)
+	assert len(covered) == length * (length - 1) // 2
+	assert all(count == 1 for count in covered.values())
+
+	# Most expensive first
+	costs = [pairs_len(*tile) for tile in tile_list]
+	assert costs == sorted(costs, reverse = True)
+
+def test_tiles_cost_model():
+	tile_list = tiles(100, 10, cost = _row_overhead_cost)
+	costs = [_row_overhead_cost(pairs_len(*tile), tile[1] - tile[0]) for tile in tile_list]
+	assert costs == sorted(costs, reverse = True)
+
+@pytest.mark.parametrize('cost', [None, _row_overhead_cost])
+@pytest.mark.parametrize('parts', PARTS)
+@pytest.mark.parametrize('length, tile_len', [
+	(0, 1), (1, 1), (2, 1), (100, 1), (100, 8), (1000, 64), (2003, 128),
+	])
+def test_tile_assignments(length, tile_len, parts, cost):
+	assignments = tile_assignments(length, tile_len, parts, cost = cost)
+	cost = pair_cost if cost is None else cost
+
+	# All tiles, each assigned once
+	assert len(assignments) == parts
+	assigned = [tile for part in assignments for tile in part]
+	assert sorted(assigned) == sorted(tiles(length, tile_len))
+
+	# Balanced: greedy keeps every part within one tile of the ideal share
+	loads = [sum(cost(pairs_len(*tile), tile[1] - tile[0]) for tile in part) for part in assignments]
+	largest = max((cost(pairs_len(*tile), tile[1] - tile[0]) for tile in assigned), default = 0)
+	assert max(loads) - min(loads) <= largest
+	assert sum(loads) == sum(cost(_pairs_brute(*tile), tile[1] - tile[0]) for tile in assigned)